@@ -5,10 +5,14 @@ CLI for the KL3M Data project.
 # imports
 import argparse
 import datetime
+import importlib
+import time
+from typing import Iterable
 
 # packages
 from rich.progress import (
     Progress,
+    TaskID,
     TextColumn,
     TaskProgressColumn,
     TimeElapsedColumn,
@@ -16,26 +20,51 @@ from rich.progress import (
 )
 
 # project imports
-from kl3m_data.sources.base_source import BaseSource, SourceDownloadStatus
-from kl3m_data.sources.eu.eu_oj.eu_oj import EUOJSource
-from kl3m_data.sources.uk.uk_legislation.uk_legislation_source import (
-    UKLegislationSource,
+from kl3m_data.sources.base_source import (
+    BaseSource,
+    SourceDownloadStatus,
+    SourceProgressStatus,
 )
-from kl3m_data.sources.us.dockets.dockets_source import DocketsSource
-from kl3m_data.sources.us.dotgov.dotgov_source import DotGovDocSource
-from kl3m_data.sources.us.ecfr.ecfr_source import ECFRSource
-from kl3m_data.sources.us.edgar.edgar_source import EDGARSource
-from kl3m_data.sources.us.fdlp import FDLPSource
-from kl3m_data.sources.us.fr.fr_source import FRSource
-from kl3m_data.sources.us.govinfo import GovInfoSource
-from kl3m_data.sources.us.recap.recap_source import RECAPSource
-from kl3m_data.sources.us.recap_docs.recap_docs_source import RECAPDocSource
-from kl3m_data.sources.us.reg_docs.reg_docs_source import RegulationsDocSource
-from kl3m_data.sources.us.usc import USCSource
-from kl3m_data.sources.us.uspto_patents.uspto_patents_source import USPTOPatentSource
-
-
-# pylint: disable=too-many-return-statements
+
+# progress display settings; sources can yield millions of statuses, so the
+# progress bar is updated at most every few hundred ms and redraws are capped
+PROGRESS_UPDATE_SECONDS = 0.25
+PROGRESS_REFRESH_PER_SECOND = 4
+# weight of the latest sample in the exponentially weighted document rate
+PROGRESS_RATE_SMOOTHING = 0.1
+
+
+# source classes by ID, imported on first use so that the CLI only loads the
+# source it runs and its dependencies; the ID can also be given without its
+# region prefix
+SOURCE_CLASSES: dict[str, str] = {
+    "us/fdlp": "kl3m_data.sources.us.fdlp.FDLPSource",
+    "us/govinfo": "kl3m_data.sources.us.govinfo.GovInfoSource",
+    "us/usc": "kl3m_data.sources.us.usc.USCSource",
+    "us/ecfr": "kl3m_data.sources.us.ecfr.ecfr_source.ECFRSource",
+    "us/fr": "kl3m_data.sources.us.fr.fr_source.FRSource",
+    "us/edgar": "kl3m_data.sources.us.edgar.edgar_source.EDGARSource",
+    "us/recap": "kl3m_data.sources.us.recap.recap_source.RECAPSource",
+    "us/recap_docs": "kl3m_data.sources.us.recap_docs.recap_docs_source.RECAPDocSource",
+    "us/uspto_patents": (
+        "kl3m_data.sources.us.uspto_patents.uspto_patents_source.USPTOPatentSource"
+    ),
+    "eu/eu_oj": "kl3m_data.sources.eu.eu_oj.eu_oj.EUOJSource",
+    "us/dockets": "kl3m_data.sources.us.dockets.dockets_source.DocketsSource",
+    "us/reg_docs": "kl3m_data.sources.us.reg_docs.reg_docs_source.RegulationsDocSource",
+    "us/dotgov": "kl3m_data.sources.us.dotgov.dotgov_source.DotGovDocSource",
+    "uk/ukleg": (
+        "kl3m_data.sources.uk.uk_legislation.uk_legislation_source.UKLegislationSource"
+    ),
+}
+SOURCE_CLASSES.update(
+    {
+        source_id.split("/", 1)[1]: class_path
+        for source_id, class_path in list(SOURCE_CLASSES.items())
+    }
+)
+
+
 def get_source(source_id: str, **kwargs) -> BaseSource:
     """
     Get a source based on the given source ID.
@@ -46,35 +75,13 @@ def get_source(source_id: str, **kwargs) -> BaseSource:
     Returns:
         BaseSource: The source object.
     """
-    if source_id in ("fdlp", "us/fdlp"):
-        return FDLPSource(**kwargs)
-    if source_id in ("govinfo", "us/govinfo"):
-        return GovInfoSource(**kwargs)
-    if source_id in ("usc", "us/usc"):
-        return USCSource(**kwargs)
-    if source_id in ("ecfr", "us/ecfr"):
-        return ECFRSource(**kwargs)
-    if source_id in ("fr", "us/fr"):
-        return FRSource(**kwargs)
-    if source_id in ("edgar", "us/edgar"):
-        return EDGARSource(**kwargs)
-    if source_id in ("recap", "us/recap"):
-        return RECAPSource(**kwargs)
-    if source_id in ("recap_docs", "us/recap_docs"):
-        return RECAPDocSource(**kwargs)
-    if source_id in ("uspto_patents", "us/uspto_patents"):
-        return USPTOPatentSource(**kwargs)
-    if source_id in ("eu_oj", "eu/eu_oj"):
-        return EUOJSource(**kwargs)
-    if source_id in ("dockets", "us/dockets"):
-        return DocketsSource(**kwargs)
-    if source_id in ("reg_docs", "us/reg_docs"):
-        return RegulationsDocSource(**kwargs)
-    if source_id in ("dotgov", "us/dotgov"):
-        return DotGovDocSource(**kwargs)
-    if source_id in ("ukleg", "uk/ukleg"):
-        return UKLegislationSource(**kwargs)
-    raise ValueError(f"Invalid source ID: {source_id}")
+    class_path = SOURCE_CLASSES.get(source_id)
+    if class_path is None:
+        raise ValueError(f"Invalid source ID: {source_id}")
+
+    module_name, class_name = class_path.rsplit(".", 1)
+    source_class = getattr(importlib.import_module(module_name), class_name)
+    return source_class(**kwargs)
 
 
 def source_download_id(
@@ -94,14 +101,44 @@ def source_download_id(
     return source.download_id(document_id, **kwargs)
 
 
-def source_download_date(source: BaseSource, date: datetime.date, **kwargs) -> None:
+def update_progress(
+    progress: Progress,
+    task_id: TaskID,
+    status: SourceProgressStatus,
+    rate: float = 0.0,
+) -> None:
     """
-    Download data from the given source with a progress bar.
+    Update a progress bar task from a source progress status.
 
     Args:
-        source: The data source to download from.
-        date: The date to download.
-        **kwargs: Additional keyword arguments for the download
+        progress: The progress bar.
+        task_id: The progress bar task.
+        status: The source progress status.
+        rate: The recent document rate per second.
+
+    Returns:
+        None
+    """
+    progress.update(
+        task_id,
+        completed=status.current,
+        total=status.total,
+        advance=1,
+        description=status.message,
+        extra=status.extra,
+        rate=f"{rate:.1f}/s",
+    )
+
+
+def track_progress(
+    source: BaseSource, statuses: Iterable[SourceProgressStatus]
+) -> None:
+    """
+    Consume the progress statuses from a source download with a progress bar.
+
+    Args:
+        source: The data source being downloaded.
+        statuses: The progress statuses yielded by the download.
 
     Returns:
         None
@@ -112,26 +149,68 @@ def source_download_date(source: BaseSource, date: datetime.date, **kwargs) -> N
         TaskProgressColumn(),
         TimeElapsedColumn(),
         TimeRemainingColumn(),
+        TextColumn("{task.fields[rate]}"),
         TextColumn("[bold blue]{task.fields[extra]}"),
     ]
-    with Progress(*progress_columns) as progress:
+    with Progress(
+        *progress_columns, refresh_per_second=PROGRESS_REFRESH_PER_SECOND
+    ) as progress:
         download_task = progress.add_task(
             f"[bold blue]Downloading {source.metadata.dataset_id}...",
             total=None,
             extra="{}",
+            rate="",
         )
-        for status in source.download_date(date, **kwargs):
-            progress.update(
-                download_task,
-                completed=status.current,
-                total=status.total,
-                advance=1,
-                description=status.message,
-                extra=status.extra,
-            )
+        status = None
+        start_time = time.monotonic()
+        last_update = start_time
+        last_current = 0
+        rate = None
+        for status in statuses:
+            # throttle on time rather than count, so slow sources still update
+            # promptly and fast sources do not update more often than needed
+            current_time = time.monotonic()
+            if current_time - last_update >= PROGRESS_UPDATE_SECONDS:
+                # track a weighted recent rate rather than the whole-run average,
+                # so the rate reflects throttling or warmup as it happens
+                sample_rate = (status.current - last_current) / (
+                    current_time - last_update
+                )
+                if rate is None:
+                    rate = sample_rate
+                else:
+                    rate += PROGRESS_RATE_SMOOTHING * (sample_rate - rate)
+                update_progress(progress, download_task, status, rate)
+                last_update = current_time
+                last_current = status.current
             if status.message:
                 progress.console.log(status.message)
 
+        # show the final status with the whole-run average and the recent rate
+        if status is not None:
+            update_progress(progress, download_task, status, rate or 0.0)
+            duration = time.monotonic() - start_time
+            progress.console.log(
+                f"Processed {status.current} documents in {duration:.1f}s: "
+                f"average={status.current / max(duration, 1e-9):.1f}/s, "
+                f"recent={rate or 0.0:.1f}/s"
+            )
+
+
+def source_download_date(source: BaseSource, date: datetime.date, **kwargs) -> None:
+    """
+    Download data from the given source with a progress bar.
+
+    Args:
+        source: The data source to download from.
+        date: The date to download.
+        **kwargs: Additional keyword arguments for the download
+
+    Returns:
+        None
+    """
+    track_progress(source, source.download_date(date, **kwargs))
+
 
 def source_download_date_range(
     source: BaseSource, start_date: datetime.date, end_date: datetime.date, **kwargs
@@ -148,31 +227,7 @@ def source_download_date_range(
     Returns:
         None
     """
-    progress_columns = [
-        TextColumn("[bold blue]{task.description}"),
-        TextColumn("[progress.percentage]{task.completed}/{task.total}"),
-        TaskProgressColumn(),
-        TimeElapsedColumn(),
-        TimeRemainingColumn(),
-        TextColumn("[bold blue]{task.fields[extra]}"),
-    ]
-    with Progress(*progress_columns) as progress:
-        download_task = progress.add_task(
-            f"[bold blue]Downloading {source.metadata.dataset_id}...",
-            total=None,
-            extra="{}",
-        )
-        for status in source.download_date_range(start_date, end_date, **kwargs):
-            progress.update(
-                download_task,
-                completed=status.current,
-                total=status.total,
-                advance=1,
-                description=status.message,
-                extra=status.extra,
-            )
-            if status.message:
-                progress.console.log(status.message)
+    track_progress(source, source.download_date_range(start_date, end_date, **kwargs))
 
 
 def source_download_all(source: BaseSource, **kwargs) -> None:
@@ -186,31 +241,7 @@ def source_download_all(source: BaseSource, **kwargs) -> None:
     Returns:
         None
     """
-    progress_columns = [
-        TextColumn("[bold blue]{task.description}"),
-        TextColumn("[progress.percentage]{task.completed}/{task.total}"),
-        TaskProgressColumn(),
-        TimeElapsedColumn(),
-        TimeRemainingColumn(),
-        TextColumn("[bold blue]{task.fields[extra]}"),
-    ]
-    with Progress(*progress_columns) as progress:
-        download_task = progress.add_task(
-            f"[bold blue]Downloading {source.metadata.dataset_id}...",
-            total=None,
-            extra="{}",
-        )
-        for status in source.download_all(**kwargs):
-            progress.update(
-                download_task,
-                completed=status.current,
-                total=status.total,
-                advance=1,
-                description=status.message,
-                extra=status.extra,
-            )
-            if status.message:
-                progress.console.log(status.message)
+    track_progress(source, source.download_all(**kwargs))
 
 
 def main() -> None:
@@ -231,38 +262,38 @@ def main() -> None:
     # collect the command kwargs
     kwargs = {}
     for arg in args.args:
-        if "=" in arg:
-            key, value = arg.split("=")
+        key, sep, value = arg.partition("=")
+        if sep:
             kwargs[key] = value
 
-    # get the source
-    source = get_source(args.source_id, **kwargs)
-
-    # execute the command
-    if args.command == "download_id":
-        # ensure we have a document ID in kwargs
-        if "document_id" not in kwargs:
-            raise ValueError("Missing document ID.")
-        source_download_id(source, **kwargs)
-    elif args.command == "download_date":
-        # ensure we have a date in kwargs
-        if "date" not in kwargs:
-            raise ValueError("Missing date.")
-        date = datetime.date.fromisoformat(kwargs.pop("date"))
-        source_download_date(source, date, **kwargs)
-    elif args.command == "download_date_range":
-        # ensure we have start and end dates in kwargs
-        if "start_date" not in kwargs:
-            raise ValueError("Missing start date.")
-        if "end_date" not in kwargs:
-            raise ValueError("Missing end date.")
-        start_date = datetime.date.fromisoformat(kwargs.pop("start_date"))
-        end_date = datetime.date.fromisoformat(kwargs.pop("end_date"))
-        source_download_date_range(source, start_date, end_date, **kwargs)
-    elif args.command == "download_all":
-        source_download_all(source, **kwargs)
-    else:
-        raise ValueError(f"Invalid command: {args.command}")
+    # get the source, closing it when the command finishes so that its clients
+    # and worker pools are shut down deterministically
+    with get_source(args.source_id, **kwargs) as source:
+        # execute the command
+        if args.command == "download_id":
+            # ensure we have a document ID in kwargs
+            if "document_id" not in kwargs:
+                raise ValueError("Missing document ID.")
+            source_download_id(source, **kwargs)
+        elif args.command == "download_date":
+            # ensure we have a date in kwargs
+            if "date" not in kwargs:
+                raise ValueError("Missing date.")
+            date = datetime.date.fromisoformat(kwargs.pop("date"))
+            source_download_date(source, date, **kwargs)
+        elif args.command == "download_date_range":
+            # ensure we have start and end dates in kwargs
+            if "start_date" not in kwargs:
+                raise ValueError("Missing start date.")
+            if "end_date" not in kwargs:
+                raise ValueError("Missing end date.")
+            start_date = datetime.date.fromisoformat(kwargs.pop("start_date"))
+            end_date = datetime.date.fromisoformat(kwargs.pop("end_date"))
+            source_download_date_range(source, start_date, end_date, **kwargs)
+        elif args.command == "download_all":
+            source_download_all(source, **kwargs)
+        else:
+            raise ValueError(f"Invalid command: {args.command}")
 
 
 if __name__ == "__main__":
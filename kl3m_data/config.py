@@ -38,10 +38,23 @@ class KL3MDataConfig:
     # aws/s3 configuration
     default_s3_bucket: str = "data.kl3m.ai"
     default_s3_region: str = "us-east-2"
-    default_s3_pool_size: int = 8
+    default_s3_pool_size: int = 32
     default_s3_connect_timeout: int = 10
     default_s3_read_timeout: int = 10
-    default_s3_retry_count: int = 3
+    default_s3_retry_count: int = 10
+    default_s3_retry_mode: str = "adaptive"
+    default_s3_prefetch_workers: int = 16
+    default_s3_prefetch_size: int = 32
+    default_s3_prefetch_bytes: int = 512 * 1024 * 1024
+    default_s3_list_prefetch_pages: int = 4
+    default_s3_upload_workers: int = 16
+    default_s3_upload_queue_size: int = 64
+    default_s3_transfer_workers: int = 16
+    default_s3_transfer_chunk_size: int = 16 * 1024 * 1024
+
+    # local cache of existing document ids, disabled unless a path is set
+    existing_ids_cache_path: Optional[str] = None
+    existing_ids_cache_ttl: int = 3600
 
     @property
     def aws_access_key(self) -> Optional[str]:
@@ -10,10 +10,12 @@ from .base_source import (
     SourceProgressStatus,
     SourceMetadata,
 )
+from .base_dedupe_source import BaseDedupeSource
 
 
 __all__ = [
     "BaseSource",
+    "BaseDedupeSource",
     "SourceDownloadStatus",
     "SourceProgressStatus",
     "SourceMetadata",
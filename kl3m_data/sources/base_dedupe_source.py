@@ -0,0 +1,447 @@
+"""
+Base source for S3 bucket sources that dedupe objects with persisted Bloom filters.
+"""
+
+# imports
+import abc
+import hashlib
+import sys
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Generator, Iterable, Optional
+
+# project
+from kl3m_data.config import CONFIG
+from kl3m_data.logger import LOGGER
+from kl3m_data.sources.base_source import (
+    BaseSource,
+    SourceMetadata,
+    SourceProgressStatus,
+)
+from kl3m_data.utils.bloom_utils import (
+    DEFAULT_ERROR_RATE,
+    DEFAULT_INITIAL_CAPACITY,
+    load_bloom_filter,
+)
+from kl3m_data.utils.s3_utils import (
+    iter_object_bytes,
+    iter_prefix_batches_prefetched,
+)
+
+# constants
+DEDUPE_SAVE_INTERVAL = 10000
+
+
+class BaseDedupeSource(BaseSource, abc.ABC):
+    """
+    Base source for S3 bucket sources that skip duplicate objects by listing ETag
+    before the GET and by content digest after it.
+    """
+
+    # number of newly stored objects between saves of the dedupe filters
+    dedupe_save_interval: int = DEDUPE_SAVE_INTERVAL
+
+    def __init__(
+        self,
+        metadata: SourceMetadata,
+        seen_hashes_file: str,
+        seen_etags_file: str,
+        **kwargs: dict[str, Any],
+    ):
+        """
+        Initialize the source.
+
+        Args:
+            metadata (SourceMetadata): Metadata for the source
+            seen_hashes_file (str): File name of the content digest filter.
+            seen_etags_file (str): File name of the listing ETag filter.
+            max_size (int): Skip objects above this size in bytes.
+            max_documents (int): Stop after this many documents.
+            dedupe_path (str): Directory to save and reload the dedupe filters.
+            dedupe_capacity (int): Expected number of objects for the filters.
+            dedupe_error_rate (float): Target false positive rate for the filters.
+        """
+        # call the super
+        super().__init__(metadata, **kwargs)
+
+        # optionally skip objects above a size in bytes, using the listing sizes
+        self.max_size: Optional[int] = None
+        if kwargs.get("max_size", None) is not None:
+            self.max_size = int(kwargs["max_size"])  # type: ignore
+
+        # optionally stop after a number of documents, which closes the object
+        # iterator and cancels any GETs prefetched beyond the limit
+        self.max_documents: Optional[int] = None
+        if kwargs.get("max_documents", None) is not None:
+            self.max_documents = int(kwargs["max_documents"])  # type: ignore
+
+        # dedupe some objects as we go in a Bloom filter keyed on the digest, which
+        # keeps memory bounded at the cost of skipping ~1e-4 of unique objects;
+        # sizing the filters to the expected object count avoids chaining extra
+        # filters, and with a dedupe path, the filters are saved periodically and
+        # reloaded so that a restarted run keeps its dedupe state
+        dedupe_capacity = int(
+            kwargs.get("dedupe_capacity", DEFAULT_INITIAL_CAPACITY)  # type: ignore
+        )
+        dedupe_error_rate = float(
+            kwargs.get("dedupe_error_rate", DEFAULT_ERROR_RATE)  # type: ignore
+        )
+        self.dedupe_path: Optional[Path] = None
+        if kwargs.get("dedupe_path", None) is not None:
+            self.dedupe_path = Path(kwargs["dedupe_path"])  # type: ignore
+        self.seen_hashes_file = seen_hashes_file
+        self.seen_etags_file = seen_etags_file
+        self.seen_hashes = load_bloom_filter(
+            self.get_dedupe_file(seen_hashes_file), dedupe_capacity, dedupe_error_rate
+        )
+        self.seen_etags = load_bloom_filter(
+            self.get_dedupe_file(seen_etags_file), dedupe_capacity, dedupe_error_rate
+        )
+
+        # dedupe keys of objects still in flight, by object key; they are only
+        # added to the filters once the object is stored, so that objects whose
+        # GET or upload fails or is cancelled are retried on resume, and are
+        # checked alongside the filters so that duplicates are not fetched twice
+        self.pending_dedupe: dict[str, tuple[Optional[bytes], Optional[bytes]]] = {}
+        self.pending_etags: set[bytes] = set()
+        self.pending_hashes: set[bytes] = set()
+        self.unsaved_dedupe_count = 0
+
+        # number of documents submitted for upload, for the max_documents limit
+        self.document_count = 0
+
+    def iter_new_keys(
+        self, bucket: str, prefix: str, current_progress: SourceProgressStatus
+    ) -> Generator[tuple[str, int], None, None]:
+        """
+        Iterate over the object keys under a prefix that still need to be retrieved,
+        skipping empty or oversized objects, documents that already exist, and objects
+        whose ETag was already listed before any GET is issued.
+
+        Args:
+            bucket (str): The bucket to list.
+            prefix (str): The bucket prefix to list.
+            current_progress (SourceProgressStatus): Progress to update for skipped objects.
+
+        Yields:
+            tuple[str, int]: Object key and size.
+        """
+        max_size = self.max_size if self.max_size is not None else sys.maxsize
+        for object_batch in iter_prefix_batches_prefetched(
+            self.s3_client, bucket, prefix
+        ):
+            # drop empty or oversized objects for the whole page from the listing
+            # sizes before any per-object requests
+            doc_objects = [
+                obj for obj in object_batch if 0 < obj.get("Size", 0) <= max_size
+            ]
+            skipped_count = len(object_batch) - len(doc_objects)
+            if skipped_count > 0:
+                LOGGER.info("Skipping %d empty or oversized objects", skipped_count)
+                current_progress.success += skipped_count
+                current_progress.current += skipped_count
+
+            for doc_object in doc_objects:
+                doc_key = doc_object["Key"]
+                doc_filename = doc_key[len(prefix) :]
+                if self.check_id(doc_filename.lstrip("/")):
+                    LOGGER.info("Skipping existing document: %s", doc_filename)
+                    current_progress.success += 1
+                    current_progress.current += 1
+                    continue
+
+                # skip objects whose listing ETag and size were already seen, since
+                # their content is a duplicate and does not need to be fetched; the
+                # filter is keyed on a 128-bit digest of both so that bit positions
+                # are uniformly distributed
+                doc_etag = doc_object.get("ETag")
+                listing_key = None
+                if doc_etag:
+                    listing_key = hashlib.blake2b(
+                        f"{doc_etag}:{doc_object['Size']}".encode(), digest_size=16
+                    ).digest()
+                    if (
+                        listing_key in self.seen_etags
+                        or listing_key in self.pending_etags
+                    ):
+                        LOGGER.info("Skipping duplicate object: %s", doc_key)
+                        current_progress.success += 1
+                        current_progress.current += 1
+                        continue
+
+                self.start_dedupe(doc_key, listing_key)
+                yield doc_key, doc_object["Size"]
+
+    def reached_max_documents(self) -> bool:
+        """
+        Check whether the document limit, if one is set, has been reached.
+
+        Returns:
+            bool: Whether to stop processing documents.
+        """
+        return (
+            self.max_documents is not None and self.document_count >= self.max_documents
+        )
+
+    def start_dedupe(self, doc_key: str, listing_key: Optional[bytes]) -> None:
+        """
+        Track the listing dedupe key of an object that is about to be fetched.
+
+        Args:
+            doc_key (str): The object key.
+            listing_key (Optional[bytes]): The ETag and size digest, if any.
+
+        Returns:
+            None
+        """
+        self.pending_dedupe[doc_key] = (listing_key, None)
+        if listing_key is not None:
+            self.pending_etags.add(listing_key)
+
+    def set_dedupe_hash(self, doc_key: str, doc_digest: bytes) -> None:
+        """
+        Track the content digest of an object whose upload is about to start.
+
+        Args:
+            doc_key (str): The object key.
+            doc_digest (bytes): The blake2b digest of the content.
+
+        Returns:
+            None
+        """
+        listing_key, _ = self.pending_dedupe.get(doc_key, (None, None))
+        self.pending_dedupe[doc_key] = (listing_key, doc_digest)
+        self.pending_hashes.add(doc_digest)
+
+    def finish_dedupe(self, doc_key: str, stored: bool) -> None:
+        """
+        Stop tracking an object in flight, and add its dedupe keys to the filters
+        if its content is stored.
+
+        Args:
+            doc_key (str): The object key.
+            stored (bool): Whether the object content is stored.
+
+        Returns:
+            None
+        """
+        listing_key, doc_digest = self.pending_dedupe.pop(doc_key, (None, None))
+        if listing_key is not None:
+            self.pending_etags.discard(listing_key)
+        if doc_digest is not None:
+            self.pending_hashes.discard(doc_digest)
+        if not stored:
+            return
+
+        if listing_key is not None:
+            self.seen_etags.add(listing_key)
+        if doc_digest is not None:
+            self.seen_hashes.add(doc_digest)
+        self.unsaved_dedupe_count += 1
+
+    def get_dedupe_file(self, file_name: str) -> Optional[Path]:
+        """
+        Get the path of a dedupe filter file, if a dedupe path is set.
+
+        Args:
+            file_name (str): The filter file name.
+
+        Returns:
+            Optional[Path]: The filter file path.
+        """
+        if self.dedupe_path is None:
+            return None
+        return self.dedupe_path / file_name
+
+    def save_dedupe_filters(self) -> None:
+        """
+        Save the dedupe filters to the dedupe path, if one is set; the filters
+        only hold objects whose content is stored, so objects still in flight
+        are never recorded.
+
+        Returns:
+            None
+        """
+        if self.dedupe_path is None:
+            return
+
+        try:
+            self.seen_hashes.save(self.dedupe_path / self.seen_hashes_file)
+            self.seen_etags.save(self.dedupe_path / self.seen_etags_file)
+            self.unsaved_dedupe_count = 0
+        except Exception as e:  # pylint: disable=broad-except
+            LOGGER.error("Error saving dedupe filters: %s", e)
+
+    def get_progress_extra(self, doc_filename: str) -> dict[str, Any]:
+        """
+        Get the extra progress fields to show for an object.
+
+        Args:
+            doc_filename (str): The object key without the listed prefix.
+
+        Returns:
+            dict[str, Any]: The extra progress fields.
+        """
+        return {"filename": doc_filename}
+
+    @abc.abstractmethod
+    def upload_document(
+        self, doc_key: str, doc_filename: str, doc_content: bytes, doc_hash: str
+    ) -> bool:
+        """
+        Build the Document for an object and upload it to S3; this runs on the
+        upload threads.
+
+        Args:
+            doc_key (str): The object key.
+            doc_filename (str): The object key without the listed prefix.
+            doc_content (bytes): The object content.
+            doc_hash (str): The blake2b hex digest of the content.
+
+        Returns:
+            bool: Whether the upload was successful.
+        """
+
+    def submit_object(
+        self,
+        doc_key: str,
+        doc_filename: str,
+        doc_content: Optional[bytes],
+        upload_executor: ThreadPoolExecutor,
+        pending_uploads: deque[tuple[str, Future]],
+        current_progress: SourceProgressStatus,
+    ) -> None:
+        """
+        Check a fetched object against the content dedupe filter and submit its
+        upload, collecting finished uploads, which records the dedupe keys of
+        stored objects.
+
+        Args:
+            doc_key (str): The object key.
+            doc_filename (str): The object key without the listed prefix.
+            doc_content (Optional[bytes]): The object content, if the GET succeeded.
+            upload_executor (ThreadPoolExecutor): The upload pool.
+            pending_uploads (deque[tuple[str, Future]]): Object keys and upload futures.
+            current_progress (SourceProgressStatus): Progress to update.
+
+        Returns:
+            None
+        """
+        # skip if missing
+        if not doc_content:
+            LOGGER.error("Error fetching object: %s", doc_key)
+            self.finish_dedupe(doc_key, False)
+            current_progress.failure += 1
+            current_progress.status = False
+            return
+
+        # check if we've already seen it; hash the buffer once and derive the hex
+        # field for the document from the same digest; the listing key is only
+        # recorded if the original is stored
+        doc_digest = hashlib.blake2b(doc_content).digest()
+        if doc_digest in self.seen_hashes or doc_digest in self.pending_hashes:
+            LOGGER.info("Skipping duplicate document: %s", doc_filename)
+            self.finish_dedupe(doc_key, doc_digest in self.seen_hashes)
+            current_progress.success += 1
+            return
+
+        # build and upload the document in the background so that parsing and
+        # PUTs overlap with the object GETs
+        self.set_dedupe_hash(doc_key, doc_digest)
+        pending_uploads.append(
+            (
+                doc_key,
+                upload_executor.submit(
+                    self.upload_document,
+                    doc_key,
+                    doc_filename,
+                    doc_content,
+                    doc_digest.hex(),
+                ),
+            )
+        )
+        self.collect_uploads(
+            pending_uploads,
+            current_progress,
+            CONFIG.default_s3_upload_queue_size,
+            self.finish_dedupe,
+        )
+        self.document_count += 1
+
+    def download_prefixes(
+        self, bucket: str, prefixes: Iterable[str], description: str
+    ) -> Generator[SourceProgressStatus, None, None]:
+        """
+        Iterate through all new objects under the prefixes and upload the relevant
+        Documents, with object GETs prefetched ahead of the dedupe checks and the
+        uploads issued from a background pool so upload latency does not block
+        the loop.
+
+        Args:
+            bucket (str): The bucket to list.
+            prefixes (Iterable[str]): The bucket prefixes to list, in order.
+            description (str): The progress description.
+
+        Yields:
+            SourceProgressStatus: The progress status.
+        """
+        # init progress
+        current_progress = SourceProgressStatus(total=None, description=description)
+
+        # list the existing documents once instead of checking each key; RECAP
+        # document ids are flat, so on a cold run without the existing ids cache
+        # this is one serial listing of the whole dataset before the first GET,
+        # and tens of millions of ids held in a set take several GB
+        self.load_existing_ids()
+
+        with ThreadPoolExecutor(
+            max_workers=CONFIG.default_s3_upload_workers
+        ) as upload_executor:
+            pending_uploads: deque[tuple[str, Future]] = deque()
+            for prefix in prefixes:
+                for doc_key, doc_content in iter_object_bytes(
+                    self.s3_client,
+                    bucket,
+                    self.iter_new_keys(bucket, prefix, current_progress),
+                ):
+                    try:
+                        doc_filename = doc_key[len(prefix) :]
+                        current_progress.extra = self.get_progress_extra(doc_filename)
+                        self.submit_object(
+                            doc_key,
+                            doc_filename,
+                            doc_content,
+                            upload_executor,
+                            pending_uploads,
+                            current_progress,
+                        )
+                    except Exception as e:  # pylint: disable=broad-except
+                        LOGGER.error("Error uploading object %s: %s", doc_key, e)
+                        self.finish_dedupe(doc_key, False)
+                        current_progress.message = str(e)
+                        current_progress.failure += 1
+                        current_progress.status = False
+                    finally:
+                        # yield progress
+                        current_progress.current += 1
+                        if self.unsaved_dedupe_count >= self.dedupe_save_interval:
+                            self.save_dedupe_filters()
+                        yield current_progress
+                        current_progress.message = None
+
+                    # stop once the document limit is reached, which closes the
+                    # object iterator and cancels any prefetched GETs
+                    if self.reached_max_documents():
+                        break
+
+                # skip the remaining prefixes once the document limit is reached
+                if self.reached_max_documents():
+                    break
+
+            # wait for the remaining uploads
+            self.collect_uploads(
+                pending_uploads, current_progress, on_upload=self.finish_dedupe
+            )
+            self.save_dedupe_filters()
+            yield current_progress
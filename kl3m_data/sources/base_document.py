@@ -10,16 +10,20 @@ https://www.dublincore.org/specifications/dublin-core/dcmi-terms/
 from __future__ import annotations
 
 # imports
+import base64
 import json
 import uuid
 from dataclasses import dataclass, field
 from typing import Optional
 
 # packages
+import orjson
+from alea_dublincore import document as dublincore_document
 from alea_dublincore.document import DublinCoreDocument
 
 # project
 from kl3m_data.config import KL3MDataConfig
+from kl3m_data.utils.compression_utils import compress_zlib
 from kl3m_data.utils.s3_utils import get_object_bytes, get_s3_client, put_object_bytes
 
 
@@ -41,6 +45,41 @@ class Document(DublinCoreDocument):
         """
         return f"documents/{self.dataset_id}/{self.id}.json"
 
+    def encode_content(self) -> Optional[str]:
+        """
+        Encode the content for serialization, compressing zlib content with
+        ISA-L; the output is still a standard zlib stream, so decode_content and
+        existing readers are unchanged.
+
+        Returns:
+            Optional[str]: The encoded content.
+        """
+        if self.content and dublincore_document.COMPRESSION_TYPE == "zlib":
+            return base64.b64encode(compress_zlib(self.content)).decode("ascii")
+        return super().encode_content()
+
+    def to_json_bytes(self) -> bytes:
+        """
+        Serialize the document to UTF-8 JSON bytes with orjson, which writes the
+        output buffer directly instead of building a str and encoding a copy.
+
+        Returns:
+            bytes: The JSON bytes.
+        """
+        document_dict = self.to_min_dict()
+        if "content" in document_dict:
+            document_dict["content"] = self.encode_content()
+
+        try:
+            return orjson.dumps(
+                document_dict,
+                default=self._default_serializer,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            # fall back for values orjson cannot encode, like integers over 64 bits
+            return self.to_json().encode("utf-8")
+
     def to_s3(self) -> bool:
         """
         Save the document to S3.
@@ -59,7 +98,7 @@ class Document(DublinCoreDocument):
             s3_client,
             KL3MDataConfig.default_s3_bucket,
             s3_key,
-            self.to_json().encode("utf-8"),
+            self.to_json_bytes(),
         )
 
     @classmethod
@@ -89,6 +128,11 @@ class Document(DublinCoreDocument):
         if object_data is None:
             return None
 
-        # load from the document otherwise
-        dc_document = cls.from_dict(json.loads(object_data.decode("utf-8")))
+        # load from the document otherwise; orjson parses the bytes without a decode
+        # pass, but rejects the NaN/Infinity literals that json.dumps may have written
+        try:
+            document_data = orjson.loads(object_data)
+        except orjson.JSONDecodeError:
+            document_data = json.loads(object_data)
+        dc_document = cls.from_dict(document_data)
         return Document(**dc_document.to_dict())
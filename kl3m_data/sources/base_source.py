@@ -5,27 +5,37 @@ Base source to standardize retrieval/update interface for all resources.
 # imports
 import abc
 import datetime
-import json
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from dataclasses import dataclass, field
 from enum import Enum, auto
-from typing import Any, Optional, Generator
+from pathlib import Path
+from typing import Any, Callable, Optional, Generator
 
 # packages
 import httpx
 import lxml.etree
 import lxml.html
+import orjson
 from playwright.sync_api import sync_playwright
 
 
 # project
 from kl3m_data.config import CONFIG
 from kl3m_data.logger import LOGGER
+from kl3m_data.utils.compression_utils import compress_zstd, decompress_bytes
 from kl3m_data.utils.httpx_utils import (
     get_default_headers,
     get_httpx_limits,
     get_httpx_timeout,
 )
-from kl3m_data.utils.s3_utils import get_s3_client, check_prefix_exists
+from kl3m_data.utils.s3_utils import (
+    get_s3_client,
+    check_prefix_exists,
+    iter_prefix_parallel,
+)
 
 
 class SourceDownloadStatus(Enum):
@@ -92,12 +102,14 @@ class BaseSource(abc.ABC):
     metadata: SourceMetadata
 
     # init method with a default httpx Client and AsyncClient configured using KL3MDataConfig
-    def __init__(self, metadata: SourceMetadata):
+    def __init__(self, metadata: SourceMetadata, **kwargs: dict[str, Any]):
         """
         Initialize the source.
 
         Args:
             metadata (SourceMetadata): Metadata for the source
+            refresh_cache (bool): List the existing ids instead of reading the
+                local existing ids cache.
         """
         # set metadata
         self.metadata = metadata
@@ -107,6 +119,17 @@ class BaseSource(abc.ABC):
         self.async_client: httpx.AsyncClient = self._init_httpx_async_client()
         self.s3_client = get_s3_client()
 
+        # existing document ids, if loaded with load_existing_ids(), with the time
+        # of the listing they came from and whether the local cache is behind them
+        self.existing_ids: Optional[set[str]] = None
+        self.existing_ids_time: Optional[float] = None
+        self.existing_ids_unsaved = False
+        self.refresh_cache = str(kwargs.get("refresh_cache", False)).lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+
         # rate limit if needed
         self.rate_limit_limit: Optional[int] = None  # x-ratelimit-limit
         self.rate_limit_remaining: Optional[int] = None  # x-ratelimit-remaining
@@ -150,8 +173,9 @@ class BaseSource(abc.ABC):
 
     def close(self):
         """
-        Close the httpx clients.
+        Close the httpx clients and save the existing ids cache.
         """
+        self.save_existing_ids_cache()
         self.client.close()
 
     def __del__(self):
@@ -332,7 +356,7 @@ class BaseSource(abc.ABC):
         request_headers = dict(self.client.headers.copy())
         if headers:
             request_headers.update(headers)
-        return json.loads(self._get(url=url, params=params, headers=request_headers))
+        return orjson.loads(self._get(url=url, params=params, headers=request_headers))
 
     def _get_json_list(
         self,
@@ -380,7 +404,7 @@ class BaseSource(abc.ABC):
         request_headers = dict(self.client.headers.copy())
         if headers:
             request_headers.update(headers)
-        return json.loads(
+        return orjson.loads(
             self._post(
                 url=url,
                 data=data,
@@ -505,9 +529,208 @@ class BaseSource(abc.ABC):
         Returns:
             bool: Whether the document exists.
         """
+        if self.existing_ids is not None:
+            return str(document_id) in self.existing_ids
+
         key_prefix = f"documents/{self.metadata.dataset_id}/{document_id}"
         return check_prefix_exists(self.s3_client, CONFIG.default_s3_bucket, key_prefix)
 
+    def mark_stored(self, document_id: int | str) -> None:
+        """
+        Record a document stored during the run, so that check_id() skips it
+        once the existing ids are loaded.
+
+        Args:
+            document_id (int | str): Document ID.
+
+        Returns:
+            None
+        """
+        if self.existing_ids is not None:
+            self.existing_ids.add(str(document_id))
+            self.existing_ids_unsaved = True
+
+    def get_existing_ids_cache_file(self) -> Optional[Path]:
+        """
+        Get the path of the local existing ids cache for the source, if a cache
+        path is configured.
+
+        Returns:
+            Optional[Path]: The cache file path.
+        """
+        if CONFIG.existing_ids_cache_path is None:
+            return None
+        return Path(CONFIG.existing_ids_cache_path) / (
+            f"{self.metadata.dataset_id}.ids.zst"
+        )
+
+    def read_existing_ids_cache(self) -> Optional[tuple[set[str], float]]:
+        """
+        Read the existing ids from the local cache if its listing is newer than
+        the configured TTL.
+
+        Returns:
+            Optional[tuple[set[str], float]]: The cached ids and the time of their
+                listing, or None on a miss.
+        """
+        cache_file = self.get_existing_ids_cache_file()
+        if cache_file is None or not cache_file.exists():
+            return None
+
+        cache_time = cache_file.stat().st_mtime
+        if time.time() - cache_time > CONFIG.existing_ids_cache_ttl:
+            return None
+
+        try:
+            cache_buffer = decompress_bytes(cache_file.read_bytes())
+            cached_ids = set(filter(None, cache_buffer.decode("utf-8").split("\n")))
+            return cached_ids, cache_time
+        except Exception as e:  # pylint: disable=broad-except
+            LOGGER.error("Error reading existing ids cache %s: %s", cache_file, e)
+            return None
+
+    def save_existing_ids_cache(self) -> None:
+        """
+        Write the existing ids, including the documents stored since they were
+        loaded, to the local cache, if a cache path is configured and the cache
+        is behind them.
+
+        The cache file keeps the time of the original listing as its mtime, so
+        that rewriting it does not extend the TTL of the listing.
+
+        Returns:
+            None
+        """
+        if self.existing_ids is None or not self.existing_ids_unsaved:
+            return
+
+        cache_file = self.get_existing_ids_cache_file()
+        if cache_file is None:
+            return
+
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = cache_file.with_name(cache_file.name + ".tmp")
+            temp_file.write_bytes(
+                compress_zstd("\n".join(self.existing_ids).encode("utf-8"))
+            )
+            if self.existing_ids_time is not None:
+                os.utime(temp_file, (self.existing_ids_time, self.existing_ids_time))
+            os.replace(temp_file, cache_file)
+            self.existing_ids_unsaved = False
+        except Exception as e:  # pylint: disable=broad-except
+            LOGGER.error("Error writing existing ids cache %s: %s", cache_file, e)
+
+    def load_existing_ids(self) -> set[str]:
+        """
+        Load the ids of all documents already stored for the source with one
+        listing, with sub-prefixes listed concurrently, so that check_id() becomes
+        an in-memory lookup instead of a LIST request per document.
+
+        If existing_ids_cache_path is configured, a cached listing newer than
+        existing_ids_cache_ttl seconds is used instead, unless the source was
+        created with refresh_cache; the cache is written when the source is
+        closed, with the documents stored during the run added, so documents
+        stored by other runs since the listing are not skipped, only stored again.
+
+        The whole listing finishes before this returns, and every id is held in
+        memory for the rest of the run. Sources whose document ids have no "/"
+        have no sub-prefixes to list concurrently, so a cold run pays for one
+        serial listing of the dataset, at 1,000 keys per request, before the
+        first download, and a set of roughly 100-150 bytes per id.
+
+        Returns:
+            set[str]: The existing document ids.
+        """
+        cached = None if self.refresh_cache else self.read_existing_ids_cache()
+        if cached is not None:
+            cached_ids, cache_time = cached
+            LOGGER.info(
+                "Loaded %d cached existing documents for %s",
+                len(cached_ids),
+                self.metadata.dataset_id,
+            )
+            self.existing_ids = cached_ids
+            self.existing_ids_time = cache_time
+            self.existing_ids_unsaved = False
+            return cached_ids
+
+        listing_time = time.time()
+        key_prefix = f"documents/{self.metadata.dataset_id}/"
+        existing_ids = set()
+        for key in iter_prefix_parallel(
+            self.s3_client, CONFIG.default_s3_bucket, key_prefix
+        ):
+            document_id = key[len(key_prefix) :]
+            if document_id.endswith(".json"):
+                document_id = document_id[: -len(".json")]
+            existing_ids.add(document_id)
+
+        LOGGER.info(
+            "Loaded %d existing documents for %s",
+            len(existing_ids),
+            self.metadata.dataset_id,
+        )
+        self.existing_ids = existing_ids
+        self.existing_ids_time = listing_time
+        self.existing_ids_unsaved = True
+        return existing_ids
+
+    @staticmethod
+    def collect_uploads(
+        pending_uploads: deque[tuple[str, Future]],
+        current_progress: SourceProgressStatus,
+        max_pending: int = 0,
+        on_upload: Optional[Callable[[str, bool], None]] = None,
+    ) -> None:
+        """
+        Collect finished background document uploads into the progress status.
+
+        Completed uploads are always collected, in whatever order they finish;
+        while more than max_pending remain, this waits for the next upload to
+        finish rather than the oldest, so max_pending=0 drains everything.
+
+        Args:
+            pending_uploads (deque[tuple[str, Future]]): Document IDs and upload futures.
+            current_progress (SourceProgressStatus): Progress to update.
+            max_pending (int): Maximum number of uploads to leave in flight.
+            on_upload (Callable[[str, bool], None]): Called with each collected
+                document ID and whether its upload succeeded.
+        """
+        while pending_uploads:
+            if len(pending_uploads) > max_pending:
+                wait(
+                    [upload_future for _, upload_future in pending_uploads],
+                    return_when=FIRST_COMPLETED,
+                )
+
+            done_uploads = [
+                pending_upload
+                for pending_upload in pending_uploads
+                if pending_upload[1].done()
+            ]
+            if not done_uploads:
+                break
+
+            for pending_upload in done_uploads:
+                pending_uploads.remove(pending_upload)
+                document_id, upload_future = pending_upload
+                try:
+                    uploaded = upload_future.result()
+                except Exception as e:  # pylint: disable=broad-except
+                    LOGGER.error("Error uploading document %s: %s", document_id, e)
+                    uploaded = False
+
+                if uploaded:
+                    current_progress.success += 1
+                else:
+                    LOGGER.error("Failed to upload document %s", document_id)
+                    current_progress.failure += 1
+                    current_progress.status = False
+
+                if on_upload is not None:
+                    on_upload(document_id, uploaded)
+
     @abc.abstractmethod
     def download_id(
         self, document_id: int | str, **kwargs: dict[str, Any]
@@ -24,8 +24,6 @@ from kl3m_data.sources.base_source import (
     SourceDownloadStatus,
     SourceProgressStatus,
 )
-from kl3m_data.utils.s3_utils import get_s3_client
-
 
 # path to revised-all-versions-htm.zip
 # assume local symlink as part of setup
@@ -58,16 +56,13 @@ class UKLegislationSource(BaseSource):
         )
 
         # call the super
-        super().__init__(metadata)
+        super().__init__(metadata, **kwargs)
 
         # set the kwargs
         self.update = kwargs.get("update", False)
         self.delay = kwargs.get("delay", 0)
         self.rate_limit = 0
 
-        # initialize the s3 client
-        self.s3_client = get_s3_client()
-
     def download_id(
         self, document_id: int | str, **kwargs: dict[str, Any]
     ) -> SourceDownloadStatus:
@@ -132,6 +127,9 @@ class UKLegislationSource(BaseSource):
             description="Uploading .gov files",
         )
 
+        # list the existing documents once instead of checking each member
+        self.load_existing_ids()
+
         # set the zip path
         with zipfile.ZipFile(DEFAULT_ZIP_PATH, "r") as zip_archive:
             zip_members = [
@@ -176,7 +174,8 @@ class UKLegislationSource(BaseSource):
                     )
 
                     # upload to s3
-                    document.to_s3()
+                    if document.to_s3():
+                        self.mark_stored(document.id)
 
                     current_progress.success += 1
                 except Exception as e:  # pylint: disable=broad-except
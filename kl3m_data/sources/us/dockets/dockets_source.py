@@ -3,15 +3,22 @@ US dockets source module
 """
 
 # imports
-import bz2
 import csv
 import datetime
 import hashlib
 import sys
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 from pathlib import Path
 from typing import Any, Generator
 
 # packages
+import zstandard
 
 # project
 from kl3m_data.logger import LOGGER
@@ -22,7 +29,12 @@ from kl3m_data.sources.base_source import (
     SourceDownloadStatus,
     SourceProgressStatus,
 )
-from kl3m_data.utils.s3_utils import get_object_bytes, get_s3_client
+from kl3m_data.utils.compression_utils import (
+    is_complete_zstd,
+    open_compressed,
+    recompress_zstd,
+)
+from kl3m_data.utils.s3_utils import get_object_path, get_s3_pool_size
 
 # extend csv parsing limits
 csv.field_size_limit(sys.maxsize)
@@ -30,6 +42,7 @@ csv.field_size_limit(sys.maxsize)
 # constants
 DOCKETS_BUCKET = "com-courtlistener-storage"
 DOCKETS_KEY = "bulk-data/dockets-2024-08-31.csv.bz2"
+DEFAULT_WORKERS = 16
 
 
 class DocketsSource(BaseSource):
@@ -44,6 +57,7 @@ class DocketsSource(BaseSource):
         Args:
             update (bool): Whether to update the source.
             delay (int): Delay between requests
+            workers (int): Number of records downloaded concurrently.
         """
         # set the metadata
         metadata = SourceMetadata(
@@ -54,7 +68,7 @@ class DocketsSource(BaseSource):
         )
 
         # call the super
-        super().__init__(metadata)
+        super().__init__(metadata, **kwargs)
 
         # set s3 source info
         self.dockets_bucket = DOCKETS_BUCKET
@@ -62,30 +76,51 @@ class DocketsSource(BaseSource):
         if "dockets_key" in kwargs:
             self.dockets_key = kwargs["dockets_key"]
 
+        # number of records downloaded concurrently, capped at the shared S3
+        # connection pool size since every record is uploaded through it
+        self.workers = int(kwargs.get("workers", DEFAULT_WORKERS))
+        if self.workers > get_s3_pool_size():
+            LOGGER.warning(
+                "Capping docket workers at %d instead of %d",
+                get_s3_pool_size(),
+                self.workers,
+            )
+            self.workers = get_s3_pool_size()
+        self.workers = max(1, self.workers)
+
     def get_docket_file(self) -> Path:
         """
         Download the docket file from the source S3 bucket and key;
         check if it already exists in this path and, if not, download it.
 
+        The bz2 bulk file is recompressed to zstd once so that later passes
+        decompress much faster; an existing bz2 cache is still used as-is.
+        An incomplete zstd cache is treated as missing and rebuilt.
+
         Returns:
             Path: The path to the docket file
         """
-        cache_path = Path(__file__).parent / "dockets.csv.bz2"
+        cache_path = Path(__file__).parent / "dockets.csv.zst"
         if cache_path.exists():
-            return cache_path
-
-        # get the s3 object
-        s3_client = get_s3_client()
-        docket_buffer = get_object_bytes(
-            s3_client, self.dockets_bucket, self.dockets_key
-        )
-
-        # save the file
-        if docket_buffer:
-            cache_path.write_bytes(docket_buffer)
-        else:
+            if is_complete_zstd(cache_path):
+                return cache_path
+            LOGGER.warning("Rebuilding incomplete docket cache %s", cache_path)
+            cache_path.unlink()
+
+        legacy_cache_path = Path(__file__).parent / "dockets.csv.bz2"
+        if legacy_cache_path.exists():
+            return legacy_cache_path
+
+        # stream the s3 object to disk, then recompress it to zstd
+        download_path = cache_path.with_suffix(".download")
+        if not get_object_path(
+            self.s3_client, self.dockets_bucket, self.dockets_key, download_path
+        ):
             raise RuntimeError("Failed to download docket file")
 
+        recompress_zstd(download_path, cache_path)
+        download_path.unlink()
+
         return cache_path
 
     def get_docket_records(self) -> Generator[dict, None, None]:
@@ -96,19 +131,52 @@ class DocketsSource(BaseSource):
         Returns:
             list[dict]: The list of docket data
         """
-        # get the s3 object
-        docket_path = self.get_docket_file()
-
-        # stream the file records with the condition filter
-        with bz2.open(docket_path, "rt") as docket_file:
-            csv_reader = csv.DictReader(docket_file)
-            for row in csv_reader:
-                # filter the url field
-                docket_entry_url = row.get("filepath_ia_json", None) or ""
-                docket_entry_url = docket_entry_url.strip().strip("`")
-                if docket_entry_url is None or "http" not in docket_entry_url.lower():
-                    continue
-                yield row
+        # stream the file records with the condition filter, checking the url
+        # field on the raw row so that a record dict is only built for the rows
+        # that are kept; a corrupt zstd cache is rebuilt once and the rows that
+        # were already read are skipped
+        rows_read = 0
+        for attempt in range(2):
+            docket_path = self.get_docket_file()
+            try:
+                with open_compressed(docket_path, "rt") as docket_file:
+                    csv_reader = csv.reader(docket_file)
+                    header = next(csv_reader, None)
+                    if header is None:
+                        return
+                    if "filepath_ia_json" not in header:
+                        raise ValueError(
+                            f"Docket file {docket_path} has no filepath_ia_json "
+                            f"column in its header: {header}"
+                        )
+                    url_index = header.index("filepath_ia_json")
+
+                    for row_number, row in enumerate(csv_reader):
+                        if row_number < rows_read:
+                            continue
+                        rows_read += 1
+
+                        # skip short or truncated rows
+                        if len(row) < len(header):
+                            LOGGER.warning(
+                                "Skipping short docket row %d with %d of %d fields",
+                                row_number + 1,
+                                len(row),
+                                len(header),
+                            )
+                            continue
+
+                        # filter the url field
+                        docket_entry_url = row[url_index].strip().strip("`")
+                        if "http" not in docket_entry_url.lower():
+                            continue
+                        yield dict(zip(header, row))
+                return
+            except zstandard.ZstdError as e:
+                if attempt > 0:
+                    raise
+                LOGGER.warning("Rebuilding corrupt docket cache %s: %s", docket_path, e)
+                docket_path.unlink(missing_ok=True)
 
     def download_id(
         self, document_id: int | str, **kwargs: dict[str, Any]
@@ -180,8 +248,11 @@ class DocketsSource(BaseSource):
             )
 
             # upload
-            doc.to_s3()
+            if not doc.to_s3():
+                LOGGER.error("Error uploading document %s", id_)
+                return SourceDownloadStatus.FAILURE
 
+            self.mark_stored(id_)
             return SourceDownloadStatus.SUCCESS
         except Exception as e:  # pylint: disable=broad-except
             LOGGER.error("Error downloading record: %s", str(e))
@@ -201,32 +272,76 @@ class DocketsSource(BaseSource):
             total=None, description="Downloading dockets..."
         )
 
-        # download each record
-        for record in self.get_docket_records():
-            try:
-                # download the record
-                download_status = self.download_record(record)
-                if download_status in (
-                    SourceDownloadStatus.SUCCESS,
-                    SourceDownloadStatus.EXISTED,
-                ):
-                    current_progress.success += 1
-                else:
-                    current_progress.failure += 1
-                current_progress.extra = {
-                    "id": record.get("id", None),
-                    "date": record.get("date_created", None),
-                }
-            except Exception as e:  # pylint: disable=broad-except
-                LOGGER.error("Error downloading document: %s", str(e))
-                current_progress.message = str(e)
-                current_progress.failure += 1
-                current_progress.status = False
-            finally:
-                current_progress.current += 1
+        # list the existing documents once instead of checking each record;
+        # docket ids are flat file names, so this is one serial listing before
+        # the first record is downloaded, with every id kept in memory
+        self.load_existing_ids()
+
+        # download records concurrently, since each one waits on an existence
+        # check, an HTTP GET, and a PUT; statuses are collected as records
+        # finish, so one slow download does not hold up the rest, with a
+        # bounded number of records in flight
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending_records: dict[Future, dict] = {}
+            for record in self.get_docket_records():
+                pending_records[executor.submit(self.download_record, record)] = record
+                if len(pending_records) < self.workers * 2:
+                    continue
+
+                done_futures, _ = wait(pending_records, return_when=FIRST_COMPLETED)
+                for record_future in done_futures:
+                    self.collect_record(
+                        pending_records.pop(record_future),
+                        record_future,
+                        current_progress,
+                    )
+                    yield current_progress
+                    current_progress.message = None
+
+            # wait for the remaining records
+            for record_future in as_completed(list(pending_records)):
+                self.collect_record(
+                    pending_records.pop(record_future),
+                    record_future,
+                    current_progress,
+                )
                 yield current_progress
                 current_progress.message = None
 
+    @staticmethod
+    def collect_record(
+        record: dict, record_future: Future, current_progress: SourceProgressStatus
+    ) -> None:
+        """
+        Wait for a record download and update the progress status.
+
+        Args:
+            record (dict): The docket record
+            record_future (Future): The future for the download_record call
+            current_progress (SourceProgressStatus): The progress status to update
+        """
+        try:
+            # download the record
+            download_status = record_future.result()
+            if download_status in (
+                SourceDownloadStatus.SUCCESS,
+                SourceDownloadStatus.EXISTED,
+            ):
+                current_progress.success += 1
+            else:
+                current_progress.failure += 1
+            current_progress.extra = {
+                "id": record.get("id", None),
+                "date": record.get("date_created", None),
+            }
+        except Exception as e:  # pylint: disable=broad-except
+            LOGGER.error("Error downloading document: %s", str(e))
+            current_progress.message = str(e)
+            current_progress.failure += 1
+            current_progress.status = False
+        finally:
+            current_progress.current += 1
+
 
 if __name__ == "__main__":
     source = DocketsSource()
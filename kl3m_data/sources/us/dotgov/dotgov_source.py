@@ -5,13 +5,13 @@
 # imports
 import datetime
 import hashlib
-import json
 import mimetypes
 import re
 from pathlib import Path
-from typing import Any, Generator
+from typing import Any, Generator, Optional
 
 # packages
+import msgspec
 import pypdfium2
 
 # project
@@ -23,7 +23,6 @@ from kl3m_data.sources.base_source import (
     SourceDownloadStatus,
     SourceProgressStatus,
 )
-from kl3m_data.utils.s3_utils import get_s3_client
 
 
 # constants
@@ -61,27 +60,31 @@ INCLUDE_MIME_TYPES = {
     "text/xml",
 }
 
-EXCLUDE_EXTENSIONS = (
-    ".css",
-    ".js",
-    ".json",
-    ".png",
-    ".jpg",
-    ".jpeg",
-    ".gif",
-    ".bmp",
-    ".svg",
-    ".ico",
-    ".webp",
-    ".webm",
-    ".mp4",
-    ".mp3",
-    ".wav",
-    ".ogg",
-    ".flac",
-    ".opus",
+EXCLUDE_EXTENSIONS = frozenset(
+    (
+        ".css",
+        ".js",
+        ".json",
+        ".png",
+        ".jpg",
+        ".jpeg",
+        ".gif",
+        ".bmp",
+        ".svg",
+        ".ico",
+        ".webp",
+        ".webm",
+        ".mp4",
+        ".mp3",
+        ".wav",
+        ".ogg",
+        ".flac",
+        ".opus",
+    )
 )
 
+GENERIC_MIME_TYPES = frozenset((None, "text/plain", "application/octet-stream"))
+
 # basic html extraction for title or meta fields
 HTML_TITLE_RE = re.compile(r"<title>(.*?)</title>", re.IGNORECASE | re.UNICODE)
 HTML_META_RE = re.compile(
@@ -89,53 +92,61 @@ HTML_META_RE = re.compile(
 )
 
 
-def is_valid_file(record: dict) -> tuple[bool, str]:
+class DotGovFileRecord(msgspec.Struct):
+    """
+    .gov file index record
+    """
+
+    member_file: str
+    mime_type: Any = None
+    size: int | float | None = None
+
+
+# decode index lines straight into typed records, loosely enough to accept
+# float or numeric string sizes and non-string mime types as json.loads did
+FILE_RECORD_DECODER = msgspec.json.Decoder(DotGovFileRecord, strict=False)
+
+
+def is_valid_file(record: DotGovFileRecord) -> tuple[bool, Optional[str]]:
     """
     Check if the file is valid to be processed.
 
     Args:
-        record (dict): The file record.
+        record (DotGovFileRecord): The file record.
 
     Returns:
         bool: True if the file is valid, False otherwise.
     """
-    # check if the file is valid
-    valid = False
-
-    # get key fields for deciding
-    member_file_path = Path(FILE_BASE_PATH) / record["member_file"]
-    member_file_name = member_file_path.name
-    member_file_type_bytes = record["mime_type"]
-    try:
-        member_file_type_extension = mimetypes.guess_type(member_file_name)[0]
-    except Exception:  # pylint: disable=broad-except
-        member_file_type_extension = None
-
-    # get size
-    member_size = record.get("size", 0) or 0
+    # check the cheap fields first, so that empty or excluded files skip the
+    # path and mime type lookups below
+    member_file_type_bytes = record.mime_type
+    if member_file_type_bytes is not None and not isinstance(
+        member_file_type_bytes, str
+    ):
+        return (False, None)
+    if (record.size or 0) <= 0:
+        return (False, member_file_type_bytes)
 
     # normalize the extension in case it's got a query string
+    member_file_path = Path(FILE_BASE_PATH) / record.member_file
     member_extension = member_file_path.suffix
     if "?" in member_extension:
         member_extension = member_extension.split("?")[0]
+    if member_extension.lower() in EXCLUDE_EXTENSIONS:
+        return (False, member_file_type_bytes)
 
-    # best extension guess
+    # best extension guess, only falling back to the file name when the
+    # detected type is missing or generic
     best_guess_type = member_file_type_bytes
-    if member_file_type_bytes in (None, "text/plain", "application/octet-stream"):
-        if member_file_type_extension not in (
-            None,
-            "text/plain",
-            "application/octet-stream",
-        ):
+    if member_file_type_bytes in GENERIC_MIME_TYPES:
+        try:
+            member_file_type_extension = mimetypes.guess_type(member_file_path.name)[0]
+        except Exception:  # pylint: disable=broad-except
+            member_file_type_extension = None
+        if member_file_type_extension not in GENERIC_MIME_TYPES:
             best_guess_type = member_file_type_extension
 
-    # check if the file is valid
-    if member_size > 0:
-        if member_extension.lower() not in EXCLUDE_EXTENSIONS:
-            if best_guess_type in INCLUDE_MIME_TYPES:
-                valid = True
-
-    return (valid, best_guess_type)
+    return (best_guess_type in INCLUDE_MIME_TYPES, best_guess_type)
 
 
 def get_metadata(content: bytes, mime_type: str) -> dict:
@@ -150,9 +161,10 @@ def get_metadata(content: bytes, mime_type: str) -> dict:
 
     # handle html type
     if mime_type in ("text/html", "application/xhtml+xml"):
-        # do not parse at this scale; just use regex
-        title_match = HTML_TITLE_RE.search(content.decode())
-        meta_matches = HTML_META_RE.findall(content.decode())
+        # do not parse at this scale; just use regex, decoding the buffer once
+        html_text = content.decode()
+        title_match = HTML_TITLE_RE.search(html_text)
+        meta_matches = HTML_META_RE.findall(html_text)
 
         # try to find the best title
         if title_match:
@@ -203,16 +215,13 @@ class DotGovDocSource(BaseSource):
         )
 
         # call the super
-        super().__init__(metadata)
+        super().__init__(metadata, **kwargs)
 
         # set the kwargs
         self.update = kwargs.get("update", False)
         self.delay = kwargs.get("delay", 0)
         self.rate_limit = 0
 
-        # initialize the s3 client
-        self.s3_client = get_s3_client()
-
     def download_id(
         self, document_id: int | str, **kwargs: dict[str, Any]
     ) -> SourceDownloadStatus:
@@ -262,6 +271,93 @@ class DotGovDocSource(BaseSource):
         # not implemented
         raise NotImplementedError("Download by date range not implemented")
 
+    def upload_record(
+        self, line: bytes, current_progress: SourceProgressStatus
+    ) -> None:
+        """
+        Decode and validate one file index record, and upload its document
+        unless it already exists.
+
+        Args:
+            line (bytes): The JSON line from the file index.
+            current_progress (SourceProgressStatus): The progress status to update.
+
+        Returns:
+            None
+        """
+        record = None
+        try:
+            record = FILE_RECORD_DECODER.decode(line)
+
+            valid, record_type = is_valid_file(record)
+            if not valid or record_type is None:
+                LOGGER.info("Skipping invalid file %s", record.member_file)
+                return
+
+            # check if it already exists
+            if self.check_id(record.member_file):
+                LOGGER.info("Document %s already exists", record.member_file)
+                current_progress.success += 1
+                return
+
+            # get full path combining the website and the file path
+            member_file_path = Path(FILE_BASE_PATH) / record.member_file
+
+            # get source as domain
+            source = record.member_file.split("/")[0]
+
+            # get contents and hash
+            content = member_file_path.read_bytes()
+            content_hash = hashlib.blake2b(content).hexdigest()
+            content_size = len(content)
+
+            # try to get basic metadata
+            metadata = get_metadata(content, record_type)
+
+            if metadata.get("title"):
+                title = metadata["title"]
+            elif metadata.get("Title"):
+                title = metadata["Title"]
+            else:
+                title = member_file_path.name
+
+            if metadata.get("description"):
+                description = metadata["description"]
+            elif metadata.get("Description"):
+                description = metadata["Description"]
+            else:
+                description = None
+
+            document = Document(
+                dataset_id=self.metadata.dataset_id,
+                id=record.member_file,
+                identifier=record.member_file,
+                format=record_type,
+                title=title,
+                description=description,
+                source=source,
+                content=content,
+                blake2b=content_hash,
+                size=content_size,
+                extra=metadata,
+            )
+
+            # upload the document
+            if document.to_s3():
+                self.mark_stored(document.id)
+                current_progress.success += 1
+            else:
+                LOGGER.error("Error uploading document %s", document.id)
+                current_progress.message = "Failed to upload document"
+                current_progress.failure += 1
+                current_progress.status = False
+        except Exception as e:  # pylint: disable=broad-except
+            doc_id = record.member_file if record is not None else None
+            LOGGER.error("Error downloading document %s: %s", doc_id, str(e))
+            current_progress.message = str(e)
+            current_progress.failure += 1
+            current_progress.status = False
+
     def download_all(
         self, **kwargs: dict[str, Any]
     ) -> Generator[SourceProgressStatus, None, None]:
@@ -277,77 +373,14 @@ class DotGovDocSource(BaseSource):
             description="Uploading .gov files",
         )
 
-        with open(FILE_INDEX_PATH, "rt", encoding="utf-8") as index_file:
+        # list the existing documents once instead of checking each record
+        self.load_existing_ids()
+
+        with open(FILE_INDEX_PATH, "rb") as index_file:
             for line in index_file:
                 current_progress.total += 1  # type: ignore
                 try:
-                    record = json.loads(line)
-
-                    valid, record_type = is_valid_file(record)
-                    if not valid:
-                        LOGGER.info("Skipping invalid file %s", record["member_file"])
-                        continue
-
-                    # check if it already exists
-                    if self.check_id(record["member_file"]):
-                        LOGGER.info("Document %s already exists", record["member_file"])
-                        current_progress.success += 1
-                        continue
-
-                    # get full path combining the website and the file path
-                    member_file_path = Path(FILE_BASE_PATH) / record["member_file"]
-
-                    # get source as domain
-                    source = record["member_file"].split("/")[0]
-
-                    # get contents and hash
-                    content = member_file_path.read_bytes()
-                    content_hash = hashlib.blake2b(content).hexdigest()
-                    content_size = len(content)
-
-                    # try to get basic metadata
-                    metadata = get_metadata(content, record_type)
-
-                    if metadata.get("title"):
-                        title = metadata["title"]
-                    elif metadata.get("Title"):
-                        title = metadata["Title"]
-                    else:
-                        title = member_file_path.name
-
-                    if metadata.get("description"):
-                        description = metadata["description"]
-                    elif metadata.get("Description"):
-                        description = metadata["Description"]
-                    else:
-                        description = None
-
-                    document = Document(
-                        dataset_id=self.metadata.dataset_id,
-                        id=record["member_file"],
-                        identifier=record["member_file"],
-                        format=record_type,
-                        title=title,
-                        description=description,
-                        source=source,
-                        content=content,
-                        blake2b=content_hash,
-                        size=content_size,
-                        extra=metadata,
-                    )
-
-                    # upload the document
-                    document.to_s3()
-                    current_progress.success += 1
-                except Exception as e:  # pylint: disable=broad-except
-                    try:
-                        doc_id = record["member_file"]
-                    except KeyError:
-                        doc_id = None
-                    LOGGER.error("Error downloading document %s: %s", doc_id, str(e))
-                    current_progress.message = str(e)
-                    current_progress.failure += 1
-                    current_progress.status = False
+                    self.upload_record(line, current_progress)
                 finally:
                     current_progress.current += 1
                     yield current_progress
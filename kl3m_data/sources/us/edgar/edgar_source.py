@@ -5,12 +5,15 @@ EDGAR source
 # imports
 import datetime
 import hashlib
-import io
 import mimetypes
+import multiprocessing
+import os
 import re
 import tarfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait
 from pathlib import Path
-from typing import Any, Generator, Literal
+from typing import Any, Generator, Literal, Optional
 
 # packages
 
@@ -24,6 +27,8 @@ from kl3m_data.sources.base_source import (
     SourceDownloadStatus,
     SourceProgressStatus,
 )
+from kl3m_data.utils.compression_utils import open_gzip_bytes
+from kl3m_data.utils.s3_utils import get_cached_s3_client
 from kl3m_data.utils.uu_utils import uudecode
 
 # constants
@@ -31,6 +36,11 @@ EDGAR_BASE_URL = "https://www.sec.gov/Archives/edgar/"
 EDGAR_MIN_DATE = datetime.date(1996, 1, 1)
 EDGAR_MAX_DATE = datetime.date.today()
 
+# read the streamed feed tar in 64 KB blocks instead of the 10 KB tarfile
+# default; larger blocks are slower, since tarfile re-slices its stream buffer
+# on every member read
+FEED_TAR_BUFSIZE = 1 << 16
+
 # EDGAR requires a specific user agent format
 # Sample Company Name AdminContact@<sample company domain>.com
 EDGAR_USER_AGENT = "ALEA Institute hello@aleainstitute.ai"
@@ -58,6 +68,7 @@ class EDGARSource(BaseSource):
             base_url (str): Base URL for the source.
             update (bool): Whether to update the source.
             delay (int): Delay between requests
+            workers (int): Number of processes parsing feed members.
         """
         # set the metadata
         metadata = SourceMetadata(
@@ -105,6 +116,52 @@ class EDGARSource(BaseSource):
         self.update = kwargs.get("update", False)
         self.delay = kwargs.get("delay", 0)
 
+        # parse feed members in worker processes since parsing is GIL-bound, with
+        # at most one process per CPU since more only adds context switches
+        max_workers = os.cpu_count() or 1
+        self.workers = int(kwargs.get("workers", max_workers))  # type: ignore
+        if self.workers > max_workers:
+            LOGGER.warning(
+                "Capping EDGAR workers at %d instead of %d", max_workers, self.workers
+            )
+            self.workers = max_workers
+        self.workers = max(1, self.workers)
+        self.process_pool: Optional[ProcessPoolExecutor] = None
+
+        # keep the arguments to build the same source in each worker process
+        self.kwargs = kwargs
+
+    def get_process_pool(self) -> ProcessPoolExecutor:
+        """
+        Get the feed parsing process pool, starting it on first use so that it is
+        reused across feed dates.
+
+        Workers are spawned rather than forked, since the pool is started after
+        the progress display and S3 transfer threads are running and a forked
+        child could inherit locks held by those threads.
+
+        Returns:
+            ProcessPoolExecutor: The process pool.
+        """
+        if self.process_pool is None:
+            self.process_pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_parse_worker,
+                initargs=(self.kwargs,),
+            )
+        return self.process_pool
+
+    def close(self):
+        """
+        Close the httpx clients and the feed parsing process pool, dropping any
+        member parses that have not started.
+        """
+        if getattr(self, "process_pool", None) is not None:
+            self.process_pool.shutdown(wait=True, cancel_futures=True)
+            self.process_pool = None
+        super().close()
+
     @staticmethod
     def decode_buffer(buffer: bytes) -> str:
         """
@@ -202,9 +259,6 @@ class EDGARSource(BaseSource):
         # get header only
         header = text[:first_doc_pos]
         for line in header.splitlines():
-            # update tag prefix
-            tag_prefix = "/".join(tag_stack)
-
             # normalize and skip empty
             line = line.strip()
             if not line:
@@ -215,18 +269,19 @@ class EDGARSource(BaseSource):
                 if len(tag_stack) > 0:
                     tag_stack.pop()
             elif line.startswith("<"):
-                first_end_tag_pos = line.find(">")
-                tag_name = tag_prefix + "/" + line[1:first_end_tag_pos]
                 if line[-1] == ">":
                     # if tag closes on this line, then push to stack
                     tag = line[1:-1]
                     if tag.lower() not in ("submission",):
                         tag_stack.append(tag)
                 else:
-                    # otherwise, the line has a value
+                    # otherwise, the line has a value; only build the tag path here
+                    first_end_tag_pos = line.find(">")
+                    tag_name = "/".join(tag_stack) + "/" + line[1:first_end_tag_pos]
                     tag_value = line[first_end_tag_pos + 1 :]
-                    if tag_name in metadata:
-                        metadata[tag_name].append(tag_value)
+                    tag_values = metadata.get(tag_name)
+                    if tag_values is not None:
+                        tag_values.append(tag_value)
                     else:
                         metadata[tag_name] = [tag_value]
 
@@ -280,6 +335,48 @@ class EDGARSource(BaseSource):
 
         return metadata
 
+    @staticmethod
+    def get_header_value(
+        submission_metadata: dict[str, Any], tag_name: str
+    ) -> Optional[str]:
+        """
+        Get the first value of a submission header field.
+
+        Args:
+            submission_metadata (dict[str, Any]): The submission metadata.
+            tag_name (str): The header tag path.
+
+        Returns:
+            Optional[str]: The first value, if the field is present.
+        """
+        tag_values = submission_metadata.get(tag_name)
+        if tag_values:
+            return tag_values[0]
+        return None
+
+    @staticmethod
+    def get_source_name(submission_metadata: dict[str, Any]) -> Optional[str]:
+        """
+        Get the source name from the first company name in the submission header,
+        in order of filer, issuer, subject company and reporting owner.
+
+        Args:
+            submission_metadata (dict[str, Any]): The submission metadata.
+
+        Returns:
+            Optional[str]: The source name.
+        """
+        for tag_name in (
+            "FILER/COMPANY-DATA/CONFORMED-NAME",
+            "ISSUER/COMPANY-DATA/CONFORMED-NAME",
+            "SUBJECT-COMPANY/COMPANY-DATA/CONFORMED-NAME",
+            "REPORTING-OWNER/COMPANY-DATA/CONFORMED-NAME",
+        ):
+            source_name = submission_metadata.get(tag_name, [None])[0]
+            if source_name:
+                return source_name
+        return None
+
     # pylint: disable=too-many-branches,too-many-statements
     def parse_doc_buffer(
         self,
@@ -296,9 +393,10 @@ class EDGARSource(BaseSource):
         """
         # parse key id fields
         try:
-            if len(submission_metadata.get("/ACCESSION-NUMBER", [])) > 0:
-                accession_number = submission_metadata["/ACCESSION-NUMBER"][0]
-            else:
+            accession_number = self.get_header_value(
+                submission_metadata, "/ACCESSION-NUMBER"
+            )
+            if accession_number is None:
                 LOGGER.info(
                     "Accession number is none for %s: %s", filename, submission_metadata
                 )
@@ -324,10 +422,7 @@ class EDGARSource(BaseSource):
             return SourceDownloadStatus.FAILURE
 
         # handle other base fields
-        if len(submission_metadata.get("/TYPE", [])) > 0:
-            submission_type = submission_metadata["/TYPE"][0]
-        else:
-            submission_type = None
+        submission_type = self.get_header_value(submission_metadata, "/TYPE")
 
         # handle form type and description
         doc_description = doc_metadata.get("description", None)
@@ -341,30 +436,7 @@ class EDGARSource(BaseSource):
             mime_type = "application/octet-stream"
 
         # handle source name
-        filer_name = submission_metadata.get(
-            "FILER/COMPANY-DATA/CONFORMED-NAME", [None]
-        )[0]
-        issuer_name = submission_metadata.get(
-            "ISSUER/COMPANY-DATA/CONFORMED-NAME", [None]
-        )[0]
-        subject_name = submission_metadata.get(
-            "SUBJECT-COMPANY/COMPANY-DATA/CONFORMED-NAME", [None]
-        )[0]
-        reporting_owner_name = submission_metadata.get(
-            "REPORTING-OWNER/COMPANY-DATA/CONFORMED-NAME", [None]
-        )[0]
-
-        # get the source name
-        if filer_name:
-            source_name = filer_name
-        elif issuer_name:
-            source_name = issuer_name
-        elif subject_name:
-            source_name = subject_name
-        elif reporting_owner_name:
-            source_name = reporting_owner_name
-        else:
-            source_name = None
+        source_name = self.get_source_name(submission_metadata)
 
         # get the identifier url by:
         # - left-stripping zeros from the cik
@@ -510,12 +582,22 @@ class EDGARSource(BaseSource):
             yield current_progress
             return
 
-        # open in tarfile context handler
+        # open in tarfile context handler; the feed is read as a stream in one
+        # decompression pass, and members are parsed in worker processes and
+        # collected in order, with a bounded number of buffers in flight; the
+        # member count is only known, and set as the total, once the stream ends
+        process_pool = self.get_process_pool()
+        pending_members: deque[tuple[str, Future]] = deque()
+        member_count = 0
         try:
-            with tarfile.open(fileobj=io.BytesIO(feed_buffer), mode="r:gz") as feed_tar:
+            with tarfile.open(
+                fileobj=open_gzip_bytes(feed_buffer),
+                mode="r|",
+                bufsize=FEED_TAR_BUFSIZE,
+            ) as feed_tar:
                 # iterate over members
-                current_progress.total = len(feed_tar.getmembers())
-                for member in feed_tar.getmembers():
+                for member in feed_tar:
+                    member_count += 1
                     try:
                         # get the file name
                         file_name = member.name
@@ -541,15 +623,22 @@ class EDGARSource(BaseSource):
                             yield current_progress
                             continue
 
-                        # read the buffer and parse it
+                        # read the buffer and hand it to a worker to parse
                         member_buffer = member_object.read()
-                        for doc_status in self.parse_nc_buffer(
-                            member_buffer, f"{feed_url}#{file_name}"
-                        ):
-                            if doc_status == SourceDownloadStatus.SUCCESS:
-                                current_progress.success += 1
-                            else:
-                                current_progress.failure += 1
+                        pending_members.append(
+                            (
+                                file_name,
+                                process_pool.submit(
+                                    parse_nc_member,
+                                    member_buffer,
+                                    f"{feed_url}#{file_name}",
+                                ),
+                            )
+                        )
+                        if len(pending_members) > self.workers * 2:
+                            self.collect_nc_member(
+                                *pending_members.popleft(), feed_url, current_progress
+                            )
                     except Exception as e:  # pylint: disable=broad-except
                         LOGGER.error(
                             "Error parsing %s in feed %s: %s",
@@ -564,6 +653,16 @@ class EDGARSource(BaseSource):
                         current_progress.current += 1
                         yield current_progress
                         current_progress.message = None
+
+            current_progress.total = member_count
+
+            # wait for the remaining members
+            while pending_members:
+                self.collect_nc_member(
+                    *pending_members.popleft(), feed_url, current_progress
+                )
+                yield current_progress
+                current_progress.message = None
         except Exception as e:  # pylint: disable=broad-except
             # set failure and return fast
             LOGGER.error("Error extracting feed: %s", str(e))
@@ -572,6 +671,45 @@ class EDGARSource(BaseSource):
             current_progress.done = True
             yield current_progress
             return
+        finally:
+            # cancel the members that have not started if the stream failed or
+            # the generator was closed early, and wait for the running ones
+            for _, member_future in pending_members:
+                member_future.cancel()
+            wait([member_future for _, member_future in pending_members])
+
+    @staticmethod
+    def collect_nc_member(
+        file_name: str,
+        member_future: Future,
+        feed_url: str,
+        current_progress: SourceProgressStatus,
+    ) -> None:
+        """
+        Wait for a feed member parsed in a worker process and count its documents.
+
+        Args:
+            file_name (str): The member file name.
+            member_future (Future): The future for the parse_nc_member call.
+            feed_url (str): The feed URL.
+            current_progress (SourceProgressStatus): Progress to update.
+        """
+        try:
+            for doc_status in member_future.result():
+                if doc_status == SourceDownloadStatus.SUCCESS:
+                    current_progress.success += 1
+                else:
+                    current_progress.failure += 1
+        except Exception as e:  # pylint: disable=broad-except
+            LOGGER.error(
+                "Error parsing %s in feed %s: %s",
+                file_name,
+                feed_url,
+                str(e),
+            )
+            current_progress.message = str(e)
+            current_progress.failure += 1
+            current_progress.status = False
 
     def download_date_range(
         self,
@@ -612,6 +750,41 @@ class EDGARSource(BaseSource):
             current_date += datetime.timedelta(days=1)
 
 
+# per-process source used by the feed parsing workers
+WORKER_SOURCE: Optional[EDGARSource] = None
+
+
+def init_parse_worker(kwargs: dict[str, Any]) -> None:
+    """
+    Initialize a feed parsing worker process with its own source and S3 client,
+    since clients inherited from the parent process are not safe to reuse.
+
+    Args:
+        kwargs (dict[str, Any]): The arguments of the parent source.
+    """
+    global WORKER_SOURCE  # pylint: disable=global-statement
+    get_cached_s3_client.cache_clear()
+    WORKER_SOURCE = EDGARSource(**kwargs)
+
+
+def parse_nc_member(
+    member_buffer: bytes, feed_filename: str
+) -> list[SourceDownloadStatus]:
+    """
+    Parse and upload the documents in an NC feed member within a worker process.
+
+    Args:
+        member_buffer (bytes): The member buffer.
+        feed_filename (str): The filename to include in the DC metadata.
+
+    Returns:
+        list[SourceDownloadStatus]: The status for each document.
+    """
+    if WORKER_SOURCE is None:
+        raise RuntimeError("Feed parsing worker is not initialized")
+    return list(WORKER_SOURCE.parse_nc_buffer(member_buffer, feed_filename))
+
+
 if __name__ == "__main__":
     source = EDGARSource()
     for y in source.download_date(datetime.date(1997, 6, 3)):
@@ -4,8 +4,11 @@ RECAP/PACER source
 
 # imports
 import datetime
-import hashlib
-from typing import Any, Generator
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Generator, Optional
 
 # packages
 import pypdfium2  # TODO: replace with alea-preprocess once public on pypi
@@ -13,17 +16,18 @@ import pypdfium2  # TODO: replace with alea-preprocess once public on pypi
 # project
 from kl3m_data.logger import LOGGER
 from kl3m_data.sources.base_document import Document
+from kl3m_data.sources.base_dedupe_source import BaseDedupeSource
 from kl3m_data.sources.base_source import (
-    BaseSource,
     SourceMetadata,
     SourceDownloadStatus,
     SourceProgressStatus,
 )
-from kl3m_data.utils.s3_utils import get_s3_client, iter_prefix, get_object_bytes
 
 # constants
 RECAP_BUCKET = "com-courtlistener-storage"
 RECAP_PREFIX = "recap/"
+SEEN_HASHES_FILE = "recap-seen-hashes.bloom"
+SEEN_ETAGS_FILE = "recap-seen-etags.bloom"
 
 # court mapping
 COURT_FULL_NAMES = {
@@ -233,7 +237,7 @@ COURT_FULL_NAMES = {
 }
 
 
-class RECAPSource(BaseSource):
+class RECAPSource(BaseDedupeSource):
     """
     RECAP source
     """
@@ -255,16 +259,58 @@ class RECAPSource(BaseSource):
         )
 
         # call the super
-        super().__init__(metadata)
+        super().__init__(metadata, SEEN_HASHES_FILE, SEEN_ETAGS_FILE, **kwargs)
 
         self.update = kwargs.get("update", False)
         self.delay = kwargs.get("delay", 0)
 
-        # initialize the s3 client
-        self.s3_client = get_s3_client()
+        # parse PDFs in worker processes, since pdfium is not thread-safe and
+        # would otherwise serialize parsing across the upload threads, with at
+        # most one process per CPU
+        max_parse_workers = os.cpu_count() or 1
+        self.parse_workers = int(
+            kwargs.get("parse_workers", max_parse_workers)  # type: ignore
+        )
+        if self.parse_workers > max_parse_workers:
+            LOGGER.warning(
+                "Capping RECAP parse workers at %d instead of %d",
+                max_parse_workers,
+                self.parse_workers,
+            )
+            self.parse_workers = max_parse_workers
+        self.parse_workers = max(1, self.parse_workers)
+        self.process_pool: Optional[ProcessPoolExecutor] = None
+        self.process_pool_lock = threading.Lock()
+
+    def get_process_pool(self) -> ProcessPoolExecutor:
+        """
+        Get the PDF parsing process pool, starting it on first use.
 
-        # dedupe some objects as we go
-        self.seen_hashes: set[str] = set()
+        The upload threads call this concurrently, so the pool is created under
+        a lock to start exactly one pool for close() to shut down. Workers are
+        spawned rather than forked, since a forked child could inherit locks
+        held by the upload and S3 transfer threads.
+
+        Returns:
+            ProcessPoolExecutor: The process pool.
+        """
+        if self.process_pool is None:
+            with self.process_pool_lock:
+                if self.process_pool is None:
+                    self.process_pool = ProcessPoolExecutor(
+                        max_workers=self.parse_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self.process_pool
+
+    def close(self):
+        """
+        Close the httpx clients and the PDF parsing process pool.
+        """
+        if getattr(self, "process_pool", None) is not None:
+            self.process_pool.shutdown(wait=True, cancel_futures=True)
+            self.process_pool = None
+        super().close()
 
     def download_id(
         self, document_id: int | str, **kwargs: dict[str, Any]
@@ -286,9 +332,8 @@ class RECAPSource(BaseSource):
 
     def get_pdf_metadata(self, pdf_content: bytes) -> dict[str, Any]:
         """
-        Extract metadata from a PDF file.
-
-        TODO: refactor to re-use alea-preprocess once public on pypi
+        Extract metadata from a PDF file in the parsing process pool, waiting
+        for the result on the calling upload thread.
 
         Args:
             pdf_content (bytes): The PDF content.
@@ -296,25 +341,80 @@ class RECAPSource(BaseSource):
         Returns:
             dict[str, Any]: The extracted metadata.
         """
-        # init metadata and obj
-        pdf_doc = None
-        metadata = {}
-        try:
-            # parse
-            pdf_doc = pypdfium2.PdfDocument(pdf_content)
-
-            # add metadata directly
-            metadata.update(pdf_doc.get_metadata_dict())
-
-            # add direct page count
-            metadata["page_count"] = len(pdf_doc)
-        except Exception as e:  # pylint: disable=broad-except
-            LOGGER.error("Error extracting PDF metadata: %s", e)
-        finally:
-            if pdf_doc:
-                pdf_doc.close()
-
-        return metadata
+        return self.get_process_pool().submit(get_pdf_metadata, pdf_content).result()
+
+    def get_progress_extra(self, doc_filename: str) -> dict[str, Any]:
+        """
+        Get the extra progress fields to show for a RECAP object.
+
+        Args:
+            doc_filename (str): The object key without the RECAP prefix.
+
+        Returns:
+            dict[str, Any]: The court and filename.
+        """
+        return {
+            "court": doc_filename.split(".")[2],
+            "filename": doc_filename,
+        }
+
+    def upload_document(
+        self, doc_key: str, doc_filename: str, doc_content: bytes, doc_hash: str
+    ) -> bool:
+        """
+        Build the Document for a RECAP object, including the PDF metadata for
+        non-docket objects, and upload it to S3.
+
+        Args:
+            doc_key (str): The object key.
+            doc_filename (str): The object key without the RECAP prefix.
+            doc_content (bytes): The object content.
+            doc_hash (str): The blake2b hex digest of the content.
+
+        Returns:
+            bool: Whether the upload was successful.
+        """
+        doc_court = doc_filename.split(".")[2]
+        doc_court_name = COURT_FULL_NAMES.get(doc_court, "Unknown")
+
+        # check if xml or pdf
+        if doc_filename.lower().endswith(".docket.xml"):
+            document = Document(
+                dataset_id=self.metadata.dataset_id,
+                id=doc_filename.lstrip("/"),
+                identifier="s3://" + RECAP_BUCKET + "/" + doc_key,
+                content=doc_content,
+                size=len(doc_content),
+                blake2b=doc_hash,
+                format="text/xml",
+                source="RECAP",
+                creator=doc_court_name,
+                publisher="Free Law Project",
+                subject=["Docket"],
+            )
+        else:
+            # get metadata extra from pypdfium2
+            doc_metadata = self.get_pdf_metadata(doc_content)
+
+            document = Document(
+                dataset_id=self.metadata.dataset_id,
+                id=doc_filename.lstrip("/"),
+                identifier="s3://" + RECAP_BUCKET + "/" + doc_key,
+                content=doc_content,
+                size=len(doc_content),
+                blake2b=doc_hash,
+                format="application/pdf",
+                source="RECAP",
+                creator=doc_court_name,
+                publisher="Free Law Project",
+                extra=doc_metadata,
+            )
+
+        if not document.to_s3():
+            return False
+
+        self.mark_stored(document.id)
+        return True
 
     def download_all(
         self, **kwargs: dict[str, Any]
@@ -328,102 +428,42 @@ class RECAPSource(BaseSource):
         Returns:
             SourceDownloadStatus: The download status.
         """
-        # init progress
-        current_progress = SourceProgressStatus(
-            total=None,
-            description="Downloading RECAP objects",
+        yield from self.download_prefixes(
+            RECAP_BUCKET, (RECAP_PREFIX,), "Downloading RECAP objects"
         )
 
-        # iterate through bucket and create corresponding Document objects
-        for doc_key in iter_prefix(self.s3_client, RECAP_BUCKET, RECAP_PREFIX):
-            try:
-                # get basic field
-                doc_filename = doc_key[len(RECAP_PREFIX) :]
-                doc_court = doc_filename.split(".")[2]
-                doc_court_name = COURT_FULL_NAMES.get(doc_court, "Unknown")
-
-                current_progress.extra = {
-                    "court": doc_court,
-                    "filename": doc_filename,
-                }
-
-                if self.check_id(doc_filename):
-                    LOGGER.info("Skipping existing document: %s", doc_filename)
-                    current_progress.success += 1
-                    continue
-
-                # fetch the pdf object
-                doc_content = get_object_bytes(
-                    self.s3_client,
-                    RECAP_BUCKET,
-                    doc_key,
-                )
-
-                # skip if missing
-                if not doc_content:
-                    LOGGER.error("Error fetching object: %s", doc_key)
-                    current_progress.failure += 1
-                    current_progress.status = False
-                    continue
-
-                # check if we've already seen it
-                doc_hash = hashlib.blake2b(doc_content).hexdigest()
-                if doc_hash in self.seen_hashes:
-                    LOGGER.info("Skipping duplicate document: %s", doc_filename)
-                    current_progress.success += 1
-                    continue
-
-                # add to seen
-                self.seen_hashes.add(doc_hash)
-
-                # check if xml or pdf
-                if doc_filename.lower().endswith(".docket.xml"):
-                    document = Document(
-                        dataset_id=self.metadata.dataset_id,
-                        id=doc_filename.lstrip("/"),
-                        identifier="s3://" + RECAP_BUCKET + "/" + doc_key,
-                        content=doc_content,
-                        size=len(doc_content),
-                        blake2b=doc_hash,
-                        format="text/xml",
-                        source="RECAP",
-                        creator=doc_court_name,
-                        publisher="Free Law Project",
-                        subject=["Docket"],
-                    )
-                else:
-                    # get metadata extra from pypdfium2
-                    doc_metadata = self.get_pdf_metadata(doc_content)
-
-                    document = Document(
-                        dataset_id=self.metadata.dataset_id,
-                        id=doc_filename.lstrip("/"),
-                        identifier="s3://" + RECAP_BUCKET + "/" + doc_key,
-                        content=doc_content,
-                        size=len(doc_content),
-                        blake2b=doc_hash,
-                        format="application/pdf",
-                        source="RECAP",
-                        creator=doc_court_name,
-                        publisher="Free Law Project",
-                        extra=doc_metadata,
-                    )
 
-                # push to s3
-                document.to_s3()
-
-                # increment
-                current_progress.success += 1
-            except Exception as e:  # pylint: disable=broad-except
-                LOGGER.error("Error uploading object %s: %s", doc_key, e)
-                current_progress.message = str(e)
-                current_progress.failure += 1
-                current_progress.status = False
-            finally:
-                # yield progress
-                current_progress.current += 1
-                yield current_progress
-                current_progress.message = None
+def get_pdf_metadata(pdf_content: bytes) -> dict[str, Any]:
+    """
+    Extract metadata from a PDF file within a worker process.
+
+    TODO: refactor to re-use alea-preprocess once public on pypi
+
+    Args:
+        pdf_content (bytes): The PDF content.
+
+    Returns:
+        dict[str, Any]: The extracted metadata.
+    """
+    # init metadata and obj
+    pdf_doc = None
+    metadata = {}
+    try:
+        # parse
+        pdf_doc = pypdfium2.PdfDocument(pdf_content)
+
+        # add metadata directly
+        metadata.update(pdf_doc.get_metadata_dict())
+
+        # add direct page count
+        metadata["page_count"] = len(pdf_doc)
+    except Exception as e:  # pylint: disable=broad-except
+        LOGGER.error("Error extracting PDF metadata: %s", e)
+    finally:
+        if pdf_doc:
+            pdf_doc.close()
+
+    return metadata
 
 
 if __name__ == "__main__":
@@ -4,7 +4,6 @@ RECAP/PACER doc/attachment source
 
 # imports
 import datetime
-import hashlib
 import mimetypes
 from typing import Any, Generator
 
@@ -12,22 +11,22 @@ from typing import Any, Generator
 # packages
 
 # project
-from kl3m_data.logger import LOGGER
 from kl3m_data.sources.base_document import Document
+from kl3m_data.sources.base_dedupe_source import BaseDedupeSource
 from kl3m_data.sources.base_source import (
-    BaseSource,
     SourceMetadata,
     SourceDownloadStatus,
     SourceProgressStatus,
 )
-from kl3m_data.utils.s3_utils import get_s3_client, iter_prefix, get_object_bytes
 
 # constants
 RECAP_BUCKET = "com-courtlistener-storage"
 RECAP_PREFIX_LIST = ("doc", "docx", "mp3", "pdf", "wpd")
+SEEN_HASHES_FILE = "recap_docs-seen-hashes.bloom"
+SEEN_ETAGS_FILE = "recap_docs-seen-etags.bloom"
 
 
-class RECAPDocSource(BaseSource):
+class RECAPDocSource(BaseDedupeSource):
     """
     RECAP doc/attachment source
     """
@@ -49,17 +48,11 @@ class RECAPDocSource(BaseSource):
         )
 
         # call the super
-        super().__init__(metadata)
+        super().__init__(metadata, SEEN_HASHES_FILE, SEEN_ETAGS_FILE, **kwargs)
 
         self.update = kwargs.get("update", False)
         self.delay = kwargs.get("delay", 0)
 
-        # initialize the s3 client
-        self.s3_client = get_s3_client()
-
-        # dedupe some objects as we go
-        self.seen_hashes: set[str] = set()
-
     def download_id(
         self, document_id: int | str, **kwargs: dict[str, Any]
     ) -> SourceDownloadStatus:
@@ -78,6 +71,45 @@ class RECAPDocSource(BaseSource):
     ) -> Generator[SourceProgressStatus, None, None]:
         raise NotImplementedError
 
+    def upload_document(
+        self, doc_key: str, doc_filename: str, doc_content: bytes, doc_hash: str
+    ) -> bool:
+        """
+        Build the Document for a RECAP doc/attachment object and upload it to S3.
+
+        Args:
+            doc_key (str): The object key.
+            doc_filename (str): The object key without the listed prefix.
+            doc_content (bytes): The object content.
+            doc_hash (str): The blake2b hex digest of the content.
+
+        Returns:
+            bool: Whether the upload was successful.
+        """
+        # get mime type
+        mime_info = mimetypes.guess_type(doc_filename)
+        if mime_info:
+            doc_mime = mime_info[0]
+        else:
+            doc_mime = "application/octet-stream"
+
+        document = Document(
+            dataset_id=self.metadata.dataset_id,
+            id=doc_filename.lstrip("/"),
+            identifier="s3://" + RECAP_BUCKET + "/" + doc_key,
+            content=doc_content,
+            size=len(doc_content),
+            blake2b=doc_hash,
+            format=doc_mime,
+            source="RECAP",
+            publisher="Free Law Project",
+        )
+        if not document.to_s3():
+            return False
+
+        self.mark_stored(document.id)
+        return True
+
     def download_all(
         self, **kwargs: dict[str, Any]
     ) -> Generator[SourceProgressStatus, None, None]:
@@ -90,87 +122,10 @@ class RECAPDocSource(BaseSource):
         Returns:
             SourceDownloadStatus: The download status.
         """
-        # init progress
-        current_progress = SourceProgressStatus(
-            total=None,
-            description="Downloading RECAP objects",
+        yield from self.download_prefixes(
+            RECAP_BUCKET, RECAP_PREFIX_LIST, "Downloading RECAP objects"
         )
 
-        # iterate through bucket and create corresponding Document objects
-        for prefix in RECAP_PREFIX_LIST:
-            for doc_key in iter_prefix(self.s3_client, RECAP_BUCKET, prefix):
-                try:
-                    # get basic field
-                    doc_filename = doc_key[len(prefix) :]
-
-                    current_progress.extra = {
-                        "filename": doc_filename,
-                    }
-
-                    if self.check_id(doc_filename):
-                        LOGGER.info("Skipping existing document: %s", doc_filename)
-                        current_progress.success += 1
-                        continue
-
-                    # fetch the pdf object
-                    doc_content = get_object_bytes(
-                        self.s3_client,
-                        RECAP_BUCKET,
-                        doc_key,
-                    )
-
-                    # skip if missing
-                    if not doc_content:
-                        LOGGER.error("Error fetching object: %s", doc_key)
-                        current_progress.failure += 1
-                        current_progress.status = False
-                        continue
-
-                    # check if we've already seen it
-                    doc_hash = hashlib.blake2b(doc_content).hexdigest()
-                    if doc_hash in self.seen_hashes:
-                        LOGGER.info("Skipping duplicate document: %s", doc_filename)
-                        current_progress.success += 1
-                        continue
-
-                    # add to seen
-                    self.seen_hashes.add(doc_hash)
-
-                    # get mime type
-                    mime_info = mimetypes.guess_type(doc_filename)
-                    if mime_info:
-                        doc_mime = mime_info[0]
-                    else:
-                        doc_mime = "application/octet-stream"
-
-                    document = Document(
-                        dataset_id=self.metadata.dataset_id,
-                        id=doc_filename.lstrip("/"),
-                        identifier="s3://" + RECAP_BUCKET + "/" + doc_key,
-                        content=doc_content,
-                        size=len(doc_content),
-                        blake2b=doc_hash,
-                        format=doc_mime,
-                        source="RECAP",
-                        publisher="Free Law Project",
-                    )
-
-                    # push to s3
-                    document.to_s3()
-
-                    # increment
-                    current_progress.success += 1
-                except Exception as e:  # pylint: disable=broad-except
-                    LOGGER.error("Error uploading object %s: %s", doc_key, e)
-                    current_progress.message = str(e)
-                    current_progress.failure += 1
-                    current_progress.status = False
-                finally:
-                    # yield progress
-                    current_progress.current += 1
-                    yield current_progress
-                    current_progress.message = None
-
 
 if __name__ == "__main__":
     source = RECAPDocSource()
@@ -12,6 +12,7 @@ from typing import Any, Generator
 
 # packages
 import httpx
+import orjson
 
 # project
 from kl3m_data.logger import LOGGER
@@ -22,7 +23,6 @@ from kl3m_data.sources.base_source import (
     SourceDownloadStatus,
     SourceProgressStatus,
 )
-from kl3m_data.utils.s3_utils import get_s3_client
 
 # constants
 BASE_API_URL = "https://api.regulations.gov/v4"
@@ -52,7 +52,7 @@ class RegulationsDocSource(BaseSource):
         )
 
         # call the super
-        super().__init__(metadata)
+        super().__init__(metadata, **kwargs)
 
         # set the base url
         self.base_url = BASE_API_URL
@@ -70,9 +70,6 @@ class RegulationsDocSource(BaseSource):
         self.delay = kwargs.get("delay", 0)
         self.rate_limit = 0
 
-        # initialize the s3 client
-        self.s3_client = get_s3_client()
-
         # dedupe some objects as we go
         self.seen_hashes: set[str] = set()
 
@@ -164,7 +161,7 @@ class RegulationsDocSource(BaseSource):
                 f"&api_key={self.api_key}"
             )
             search_response = self._get_response(search_url)
-            search_data = search_response.json()
+            search_data = orjson.loads(search_response.content)
 
             # update the delay and sleep
             self.update_rate_limit(search_response.headers)
@@ -212,7 +209,7 @@ class RegulationsDocSource(BaseSource):
                 f"&api_key={self.api_key}"
             )
             search_response = self._get_response(search_url)
-            search_data = search_response.json()
+            search_data = orjson.loads(search_response.content)
 
             # update the delay and sleep
             self.update_rate_limit(search_response.headers)
@@ -308,7 +305,8 @@ class RegulationsDocSource(BaseSource):
                 )
 
                 # upload to s3
-                document.to_s3()
+                if document.to_s3():
+                    self.mark_stored(id_)
 
             return SourceDownloadStatus.SUCCESS
         except Exception as e:  # pylint: disable=broad-except
@@ -341,7 +339,7 @@ class RegulationsDocSource(BaseSource):
 
         # get the document data
         document_response = self._get_response(detail_url)
-        document_data = document_response.json()
+        document_data = orjson.loads(document_response.content)
 
         # update the delay and sleep
         self.update_rate_limit(document_response.headers)
@@ -486,6 +484,9 @@ class RegulationsDocSource(BaseSource):
             description="Downloading regulations.gov docs",
         )
 
+        # list the existing documents once instead of checking each file
+        self.load_existing_ids()
+
         # get all dates
         current_date = self.min_date
         while current_date <= self.max_date:
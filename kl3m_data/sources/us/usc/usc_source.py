@@ -16,6 +16,7 @@ import lxml.html
 
 # project
 from kl3m_data.logger import LOGGER
+from kl3m_data.sources.base_document import Document
 from kl3m_data.sources.base_source import (
     BaseSource,
     SourceMetadata,
@@ -55,7 +56,7 @@ class USCSource(BaseSource):
         )
 
         # call the super
-        super().__init__(metadata)
+        super().__init__(metadata, **kwargs)
 
         # set release congress and public law number
         self.release_congress = kwargs.get("release_congress", DEFAULT_RELEASE_CONGRESS)
@@ -178,6 +179,32 @@ class USCSource(BaseSource):
                         contents=zip_member_file.read(),
                     )
 
+    def upload_document(
+        self, doc: Document, current_progress: SourceProgressStatus
+    ) -> None:
+        """
+        Upload a parsed document unless it already exists, and record the result
+        in the progress status.
+
+        Args:
+            doc (Document): The document.
+            current_progress (SourceProgressStatus): Progress to update.
+
+        Returns:
+            None
+        """
+        if self.check_id(doc.id):
+            LOGGER.info("Document already uploaded: %s", doc.id)
+            current_progress.success += 1
+        elif doc.to_s3():
+            self.mark_stored(doc.id)
+            current_progress.success += 1
+        else:
+            LOGGER.error("Error uploading document %s", doc.id)
+            current_progress.message = "Failed to upload document"
+            current_progress.failure += 1
+            current_progress.status = False
+
     # pylint: disable=too-many-nested-blocks
     def download_release_title_documents(
         self,
@@ -243,13 +270,7 @@ class USCSource(BaseSource):
                                 "title": title,
                                 "document": doc.id,
                             }
-                            if self.check_id(doc.id):
-                                LOGGER.info("Document already uploaded: %s", doc.id)
-                            else:
-                                doc.to_s3()
-
-                            # inc and yield
-                            current_progress.success += 1
+                            self.upload_document(doc, current_progress)
                         except Exception as e:  # pylint: disable=broad-except
                             LOGGER.error("Error parsing document: %s", str(e))
                             current_progress.message = str(e)
@@ -315,6 +336,9 @@ class USCSource(BaseSource):
         congress = kwargs.get("release_congress", self.release_congress)
         public_law = kwargs.get("release_pl_number", self.release_pl_number)
 
+        # list the existing documents once instead of checking each section
+        self.load_existing_ids()
+
         # download all titles
         for title in range(1, MAX_TITLES + 1):
             yield from self.download_release_title_documents(
@@ -620,6 +620,11 @@ class USPTOPatentSource(BaseSource):
                                     input_file.read()
                                 ):
                                     try:
+                                        # encode once for the content and hash
+                                        patent_content = patent_record[
+                                            "markdown"
+                                        ].encode("utf-8")
+
                                         # create a document from it
                                         patent_doc = Document(
                                             dataset_id=self.metadata.dataset_id,
@@ -627,13 +632,9 @@ class USPTOPatentSource(BaseSource):
                                             identifier=f"{filename}#{patent_record['patent_number']}",
                                             date=patent_record["issue_date"],
                                             title=patent_record["title"],
-                                            content=patent_record["markdown"].encode(
-                                                "utf-8"
-                                            ),
+                                            content=patent_content,
                                             blake2b=hashlib.blake2b(
-                                                patent_record["markdown"].encode(
-                                                    "utf-8"
-                                                )
+                                                patent_content
                                             ).hexdigest(),
                                             size=len(patent_record["markdown"]),
                                             publisher="US Patent and Trademark Office",
@@ -663,6 +664,11 @@ class USPTOPatentSource(BaseSource):
                                     input_file.read()
                                 ):
                                     try:
+                                        # encode once for the content and hash
+                                        patent_content = patent_record[
+                                            "markdown"
+                                        ].encode("utf-8")
+
                                         # create a document from it
                                         patent_doc = Document(
                                             dataset_id=self.metadata.dataset_id,
@@ -670,13 +676,9 @@ class USPTOPatentSource(BaseSource):
                                             identifier=f"{filename}#{patent_record['patent_number']}",
                                             date=patent_record["issue_date"],
                                             title=patent_record["title"],
-                                            content=patent_record["markdown"].encode(
-                                                "utf-8"
-                                            ),
+                                            content=patent_content,
                                             blake2b=hashlib.blake2b(
-                                                patent_record["markdown"].encode(
-                                                    "utf-8"
-                                                )
+                                                patent_content
                                             ).hexdigest(),
                                             size=len(patent_record["markdown"]),
                                             publisher="US Patent and Trademark Office",
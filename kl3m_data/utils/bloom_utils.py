@@ -0,0 +1,330 @@
+"""
+Bloom filter utilities for memory-bounded deduplication
+"""
+
+# imports
+import hashlib
+import math
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+# constants
+DEFAULT_INITIAL_CAPACITY = 1_000_000
+DEFAULT_ERROR_RATE = 1e-4
+DEFAULT_GROWTH_FACTOR = 2
+DEFAULT_TIGHTENING_RATIO = 0.5
+BLOOM_FILE_MAGIC = b"KL3MBF01"
+SCALABLE_HEADER = struct.Struct("<QdQdQ")
+FILTER_HEADER = struct.Struct("<QdQQQ")
+
+
+class BloomFilter:
+    """
+    Fixed-capacity Bloom filter over byte keys.
+
+    Membership tests may return false positives at roughly error_rate once the
+    filter holds capacity keys, but never false negatives.  Keys are expected to
+    be uniformly distributed digests, such as a raw 128-bit blake2b digest, and
+    their first 16 bytes are used directly to derive bit positions; shorter keys
+    are hashed first.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE):
+        """
+        Initialize the filter.
+
+        Args:
+            capacity (int): Number of keys the filter is sized for.
+            error_rate (float): False positive rate at capacity.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+
+        # standard sizing for m bits and k hash functions
+        self.num_bits = max(
+            8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def get_positions(self, key: bytes) -> list[int]:
+        """
+        Get the bit positions for a key using double hashing.
+
+        Args:
+            key (bytes): The key.
+
+        Returns:
+            list[int]: The bit positions.
+        """
+        if len(key) < 16:
+            key = hashlib.blake2b(key, digest_size=16).digest()
+
+        hash_1 = int.from_bytes(key[:8], "little")
+        hash_2 = int.from_bytes(key[8:16], "little") | 1
+        return [(hash_1 + i * hash_2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, key: bytes) -> bool:
+        """
+        Check whether a key may have been added.
+
+        Args:
+            key (bytes): The key.
+
+        Returns:
+            bool: False if the key was definitely not added.
+        """
+        bits = self.bits
+        for position in self.get_positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self) -> int:
+        """
+        Get the number of keys added.
+
+        Returns:
+            int: The number of keys added.
+        """
+        return self.count
+
+    def add(self, key: bytes) -> bool:
+        """
+        Add a key to the filter.
+
+        Args:
+            key (bytes): The key.
+
+        Returns:
+            bool: True if the key was new, False if it may already have been added.
+        """
+        bits = self.bits
+        is_new = False
+        for position in self.get_positions(key):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                is_new = True
+
+        if is_new:
+            self.count += 1
+        return is_new
+
+    def write(self, output_file: BinaryIO) -> None:
+        """
+        Write the filter parameters and bits to a binary file.
+
+        Args:
+            output_file (BinaryIO): The open output file.
+
+        Returns:
+            None
+        """
+        output_file.write(
+            FILTER_HEADER.pack(
+                self.capacity,
+                self.error_rate,
+                self.num_bits,
+                self.num_hashes,
+                self.count,
+            )
+        )
+        output_file.write(self.bits)
+
+    @classmethod
+    def read(cls, input_file: BinaryIO) -> "BloomFilter":
+        """
+        Read a filter written by write() from a binary file.
+
+        Args:
+            input_file (BinaryIO): The open input file.
+
+        Returns:
+            BloomFilter: The filter.
+        """
+        capacity, error_rate, num_bits, num_hashes, count = FILTER_HEADER.unpack(
+            input_file.read(FILTER_HEADER.size)
+        )
+        bloom_filter = cls.__new__(cls)
+        bloom_filter.capacity = capacity
+        bloom_filter.error_rate = error_rate
+        bloom_filter.num_bits = num_bits
+        bloom_filter.num_hashes = num_hashes
+        bloom_filter.count = count
+        bloom_filter.bits = bytearray(input_file.read((num_bits + 7) // 8))
+        if len(bloom_filter.bits) != (num_bits + 7) // 8:
+            raise ValueError("Truncated Bloom filter file")
+        return bloom_filter
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that grows by chaining larger filters as keys are added, so the
+    number of keys does not need to be known up front.
+
+    Each new filter has growth_factor times the capacity and tightening_ratio
+    times the error rate of the previous one, which keeps the overall false
+    positive rate below error_rate.
+    """
+
+    def __init__(
+        self,
+        initial_capacity: int = DEFAULT_INITIAL_CAPACITY,
+        error_rate: float = DEFAULT_ERROR_RATE,
+        growth_factor: int = DEFAULT_GROWTH_FACTOR,
+        tightening_ratio: float = DEFAULT_TIGHTENING_RATIO,
+    ):
+        """
+        Initialize the filter.
+
+        Args:
+            initial_capacity (int): Capacity of the first filter.
+            error_rate (float): Overall false positive rate bound.
+            growth_factor (int): Capacity multiplier for each new filter.
+            tightening_ratio (float): Error rate multiplier for each new filter.
+        """
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth_factor = growth_factor
+        self.tightening_ratio = tightening_ratio
+        self.filters: list[BloomFilter] = [
+            BloomFilter(initial_capacity, error_rate * (1 - tightening_ratio))
+        ]
+
+    def __contains__(self, key: bytes) -> bool:
+        """
+        Check whether a key may have been added.
+
+        Args:
+            key (bytes): The key.
+
+        Returns:
+            bool: False if the key was definitely not added.
+        """
+        return any(key in bloom_filter for bloom_filter in self.filters)
+
+    def __len__(self) -> int:
+        """
+        Get the number of keys added.
+
+        Returns:
+            int: The number of keys added.
+        """
+        return sum(len(bloom_filter) for bloom_filter in self.filters)
+
+    def add(self, key: bytes) -> bool:
+        """
+        Add a key to the filter, starting a larger filter once the current one
+        reaches its capacity.
+
+        Args:
+            key (bytes): The key.
+
+        Returns:
+            bool: True if the key was new, False if it may already have been added.
+        """
+        if key in self:
+            return False
+
+        current_filter = self.filters[-1]
+        if len(current_filter) >= current_filter.capacity:
+            current_filter = BloomFilter(
+                current_filter.capacity * self.growth_factor,
+                current_filter.error_rate * self.tightening_ratio,
+            )
+            self.filters.append(current_filter)
+
+        return current_filter.add(key)
+
+    def save(self, path: str | Path) -> None:
+        """
+        Save the filter to a file, writing to a temporary file first so that an
+        interrupted save does not corrupt an existing file.
+
+        Args:
+            path (str | Path): The file path.
+
+        Returns:
+            None
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.name + ".tmp")
+        with open(temp_path, "wb") as output_file:
+            output_file.write(BLOOM_FILE_MAGIC)
+            output_file.write(
+                SCALABLE_HEADER.pack(
+                    self.initial_capacity,
+                    self.error_rate,
+                    self.growth_factor,
+                    self.tightening_ratio,
+                    len(self.filters),
+                )
+            )
+            for bloom_filter in self.filters:
+                bloom_filter.write(output_file)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ScalableBloomFilter":
+        """
+        Load a filter saved by save().
+
+        Args:
+            path (str | Path): The file path.
+
+        Returns:
+            ScalableBloomFilter: The filter.
+        """
+        with open(path, "rb") as input_file:
+            if input_file.read(len(BLOOM_FILE_MAGIC)) != BLOOM_FILE_MAGIC:
+                raise ValueError(f"Not a Bloom filter file: {path}")
+
+            (
+                initial_capacity,
+                error_rate,
+                growth_factor,
+                tightening_ratio,
+                num_filters,
+            ) = SCALABLE_HEADER.unpack(input_file.read(SCALABLE_HEADER.size))
+            scalable_filter = cls.__new__(cls)
+            scalable_filter.initial_capacity = initial_capacity
+            scalable_filter.error_rate = error_rate
+            scalable_filter.growth_factor = growth_factor
+            scalable_filter.tightening_ratio = tightening_ratio
+            scalable_filter.filters = [
+                BloomFilter.read(input_file) for _ in range(num_filters)
+            ]
+
+        return scalable_filter
+
+
+def load_bloom_filter(
+    path: Optional[str | Path] = None,
+    initial_capacity: int = DEFAULT_INITIAL_CAPACITY,
+    error_rate: float = DEFAULT_ERROR_RATE,
+) -> ScalableBloomFilter:
+    """
+    Load a saved filter, or return a new empty filter if there is no path or the
+    file does not exist.
+
+    Args:
+        path (str | Path): The file path.
+        initial_capacity (int): Capacity of the first filter for a new filter.
+        error_rate (float): Overall false positive rate bound for a new filter.
+
+    Returns:
+        ScalableBloomFilter: The filter.
+    """
+    if path is not None and Path(path).exists():
+        return ScalableBloomFilter.load(path)
+    return ScalableBloomFilter(initial_capacity=initial_capacity, error_rate=error_rate)
@@ -3,25 +3,45 @@ S3 utilities
 """
 
 # imports
+import functools
+import os
+import queue
+import random
+import threading
 import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Optional, Generator
+from typing import Any, Iterable, Optional, Generator
 
 # packages
 import boto3
 import botocore.config
-
+import botocore.exceptions
+from boto3.s3.transfer import TransferConfig
 
 # project
-from kl3m_data.config import KL3MDataConfig
+from kl3m_data.config import CONFIG
 from kl3m_data.logger import LOGGER
 
+# constants
+PUT_OBJECT_ATTEMPTS = 3
+PUT_OBJECT_BACKOFF = 1.0
+RANGE_READ_SIZE = 1024 * 1024
+THROTTLING_ERROR_CODES = {
+    "SlowDown",
+    "503",
+    "ServiceUnavailable",
+    "RequestLimitExceeded",
+}
+
 
 def get_s3_config(
     pool_size: Optional[int] = None,
     connect_timeout: Optional[int] = None,
     read_timeout: Optional[int] = None,
     retry_count: Optional[int] = None,
+    retry_mode: Optional[str] = None,
 ) -> botocore.config.Config:
     """
     Get an S3 configuration object with the specified parameters.
@@ -31,6 +51,8 @@ def get_s3_config(
         connect_timeout (int): Connection timeout in seconds.
         read_timeout (int): Read timeout in seconds.
         retry_count (int): Number of retries.
+        retry_mode (str): botocore retry mode; "adaptive" also rate-limits the
+            client when S3 starts throttling.
 
     Returns:
         botocore.config.Config: An S3 configuration object.
@@ -48,12 +70,67 @@ def get_s3_config(
     if retry_count is not None:
         config.retries = {
             "max_attempts": retry_count,
-            "mode": "standard",
+            "mode": retry_mode or "standard",
         }
 
+    # keep idle pooled connections alive between requests
+    config.tcp_keepalive = True
+
     return config
 
 
+@functools.lru_cache(maxsize=8)
+def get_cached_s3_client(
+    pool_size: int,
+    connect_timeout: int,
+    read_timeout: int,
+    retry_count: int,
+    retry_mode: str,
+) -> boto3.client:
+    """
+    Get a shared S3 client for the specified parameters, so that every caller
+    with the same settings reuses one connection pool instead of opening new
+    TLS connections for each client.
+
+    Args:
+        pool_size (int): Number of connections in the pool.
+        connect_timeout (int): Connection timeout in seconds.
+        read_timeout (int): Read timeout in seconds.
+        retry_count (int): Number of retries.
+        retry_mode (str): botocore retry mode.
+
+    Returns:
+        boto3.client: An S3 client.
+    """
+    return boto3.client(
+        "s3",
+        config=get_s3_config(
+            pool_size=pool_size,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retry_count=retry_count,
+            retry_mode=retry_mode,
+        ),
+    )
+
+
+def get_s3_pool_size() -> int:
+    """
+    Get the connection pool size for the shared S3 client, which is at least the
+    number of threads that can issue requests on it at once, so that prefetch
+    and upload workers never wait on each other for a pooled connection.
+
+    Returns:
+        int: The connection pool size.
+    """
+    return max(
+        CONFIG.default_s3_pool_size,
+        CONFIG.default_s3_prefetch_workers
+        + CONFIG.default_s3_upload_workers
+        + CONFIG.default_s3_transfer_workers,
+    )
+
+
 def get_s3_client(
     config: Optional[botocore.config.Config] = None,
 ) -> boto3.client:
@@ -61,15 +138,24 @@ def get_s3_client(
     Get an S3 client with the specified configuration, relying on standard
     boto environment variables for credentials.
 
+    If no configuration is provided, the shared client for the default
+    configuration is returned.
+
     Args:
         config (botocore.config.Config): S3 configuration object.
 
     Returns:
         boto3.client: An S3 client.
     """
-    # get default if not provided
+    # use the shared client if not provided
     if config is None:
-        config = get_s3_config()
+        return get_cached_s3_client(
+            pool_size=get_s3_pool_size(),
+            connect_timeout=CONFIG.default_s3_connect_timeout,
+            read_timeout=CONFIG.default_s3_read_timeout,
+            retry_count=CONFIG.default_s3_retry_count,
+            retry_mode=CONFIG.default_s3_retry_mode,
+        )
 
     # create the S3 client
     client = boto3.client(
@@ -80,6 +166,60 @@ def get_s3_client(
     return client
 
 
+def is_throttling_error(error: Exception) -> bool:
+    """
+    Check whether an exception is an S3 throttling response, such as a 503
+    SlowDown, which is expected at high concurrency and retried by the client.
+
+    Args:
+        error (Exception): The exception.
+
+    Returns:
+        bool: Whether the exception is a throttling error.
+    """
+    if isinstance(error, botocore.exceptions.ClientError):
+        error_code = error.response.get("Error", {}).get("Code")
+        status_code = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return error_code in THROTTLING_ERROR_CODES or status_code == 503
+    return False
+
+
+def log_s3_error(message: str, error: Exception, final: bool = True) -> None:
+    """
+    Log an S3 error, keeping throttling responses on attempts that will be
+    retried at DEBUG so that expected slowdowns under load do not flood the
+    error log; a final failure is always logged at ERROR.
+
+    Args:
+        message (str): The log message, with a %s placeholder for the error.
+        error (Exception): The exception.
+        final (bool): Whether the operation will not be retried.
+
+    Returns:
+        None
+    """
+    if not final and is_throttling_error(error):
+        LOGGER.debug(message, error)
+    else:
+        LOGGER.error(message, error)
+
+
+def get_transfer_config() -> TransferConfig:
+    """
+    Get the managed transfer configuration for large objects, which splits them
+    into ranged parts transferred in parallel over the shared connection pool.
+
+    Returns:
+        TransferConfig: The transfer configuration.
+    """
+    return TransferConfig(
+        multipart_threshold=CONFIG.default_s3_transfer_chunk_size,
+        multipart_chunksize=CONFIG.default_s3_transfer_chunk_size,
+        max_concurrency=CONFIG.default_s3_transfer_workers,
+        preferred_transfer_client="auto",
+    )
+
+
 def put_object_bytes(
     client: boto3.client,
     bucket: str,
@@ -104,7 +244,7 @@ def put_object_bytes(
 
     # put the object into the bucket
     try:
-        for _ in range(KL3MDataConfig.default_s3_retry_count):
+        for attempt in range(PUT_OBJECT_ATTEMPTS):
             try:
                 # put the object
                 client.put_object(
@@ -115,8 +255,12 @@ def put_object_bytes(
                 LOGGER.info("Put object %s/%s (%d)", bucket, key, len(data))
                 return True
             except Exception as e:  # pylint: disable=broad-except
-                LOGGER.error("Error putting object: %s", e)
-                time.sleep(1)
+                final_attempt = attempt + 1 == PUT_OBJECT_ATTEMPTS
+                log_s3_error("Error putting object: %s", e, final_attempt)
+
+                # back off exponentially with jitter after the client's own retries
+                if not final_attempt:
+                    time.sleep(PUT_OBJECT_BACKOFF * 2**attempt * (1 + random.random()))
     except Exception as e:  # pylint: disable=broad-except
         LOGGER.error("Error putting object: %s", e)
         return False
@@ -128,7 +272,9 @@ def put_object_path(
     client: boto3.client, bucket: str, key: str, path: str | Path
 ) -> bool:
     """
-    Put an object into an S3 bucket.
+    Put an object into an S3 bucket from a file, streaming it from disk with a
+    multipart upload above the transfer threshold instead of reading the whole
+    file into memory.
 
     Args:
         client (boto3.client): S3 client.
@@ -137,19 +283,22 @@ def put_object_path(
         path (str | Path): Path to the object.
 
     Returns:
-        None
+        bool: Whether the object was put.
     """
-    # read the object data
+    # upload the object into the bucket
     try:
-        with open(path, "rb") as input_file:
-            data = input_file.read()
+        client.upload_file(
+            Filename=str(path),
+            Bucket=bucket,
+            Key=key,
+            Config=get_transfer_config(),
+        )
+        LOGGER.info("Put object %s/%s from %s", bucket, key, path)
+        return True
     except Exception as e:  # pylint: disable=broad-except
-        LOGGER.error("Error reading object data: %s", e)
+        LOGGER.error("Error putting object: %s", e)
         return False
 
-    # put the object into the bucket
-    return put_object_bytes(client, bucket, key, data)
-
 
 def get_object_bytes(
     client: boto3.client,
@@ -177,10 +326,195 @@ def get_object_bytes(
         LOGGER.info("Got object %s://%s (%d)", bucket, key, len(data))
         return data
     except Exception as e:  # pylint: disable=broad-except
-        LOGGER.error("Error getting object: %s", e)
+        log_s3_error("Error getting object: %s", e)
+        return None
+
+
+def get_object_bytes_ranged(
+    client: boto3.client,
+    bucket: str,
+    key: str,
+    size: int,
+    part_size: Optional[int] = None,
+) -> Optional[bytes | bytearray]:
+    """
+    Get an object from an S3 bucket with parallel ranged GETs, since a single
+    stream is limited to well below the available bandwidth for large objects.
+
+    Objects no larger than one part are fetched with a single GET.
+
+    Args:
+        client (boto3.client): S3 client.
+        bucket (str): Bucket name.
+        key (str): Object key.
+        size (int): Object size in bytes, e.g., from the listing.
+        part_size (int): Size of each ranged GET in bytes.
+
+    Returns:
+        bytes | bytearray: Object data, as a bytearray when fetched in ranges.
+    """
+    part_size = part_size or CONFIG.default_s3_transfer_chunk_size
+    if size <= part_size:
+        return get_object_bytes(client, bucket, key)
+
+    # allocate the object once and have each range write into its own slice, so
+    # the parts are not held separately and then copied again by a join
+    data = bytearray(size)
+    data_view = memoryview(data)
+
+    def get_range(start: int) -> None:
+        end = min(start + part_size, size)
+        response = client.get_object(
+            Bucket=bucket,
+            Key=key,
+            Range=f"bytes={start}-{end - 1}",
+        )
+        position = start
+        while position < end:
+            chunk = response["Body"].read(min(RANGE_READ_SIZE, end - position))
+            if not chunk:
+                break
+            data_view[position : position + len(chunk)] = chunk
+            position += len(chunk)
+        if position != end:
+            raise ValueError(f"Short read for bytes {start}-{end - 1}")
+
+    # ranges run on their own pool, since callers may be prefetch threads
+    try:
+        executor = get_prefetch_executor(CONFIG.default_s3_transfer_workers, "s3-range")
+        for _ in executor.map(get_range, range(0, size, part_size)):
+            pass
+        LOGGER.info("Got object %s://%s (%d, ranged)", bucket, key, len(data))
+        return data
+    except Exception as e:  # pylint: disable=broad-except
+        log_s3_error("Error getting object: %s", e)
         return None
 
 
+def get_object_path(
+    client: boto3.client,
+    bucket: str,
+    key: str,
+    path: str | Path,
+) -> bool:
+    """
+    Get an object from an S3 bucket and write it to a file, streaming the body
+    to disk instead of holding it in memory.
+
+    Args:
+        client (boto3.client): S3 client.
+        bucket (str): Bucket name.
+        key (str): Object key.
+        path (str | Path): Path to write the object to.
+
+    Returns:
+        bool: Whether the object was written.
+    """
+    # download the object from the bucket
+    try:
+        client.download_file(
+            Bucket=bucket,
+            Key=key,
+            Filename=str(path),
+            Config=get_transfer_config(),
+        )
+        LOGGER.info("Got object %s://%s to %s", bucket, key, path)
+        return True
+    except Exception as e:  # pylint: disable=broad-except
+        LOGGER.error("Error getting object: %s", e)
+        return False
+
+
+@functools.lru_cache(maxsize=None)
+def get_prefetch_executor(
+    max_workers: int, thread_name_prefix: str = "s3-get"
+) -> ThreadPoolExecutor:
+    """
+    Get a shared, long-lived executor for prefetching object GETs, so that
+    repeated prefetch passes reuse the same threads instead of starting and
+    joining a new pool each time.
+
+    Args:
+        max_workers (int): Number of threads issuing requests.
+        thread_name_prefix (str): Thread name prefix, which also keeps pools for
+            different request types separate.
+
+    Returns:
+        ThreadPoolExecutor: The executor.
+    """
+    return ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix=thread_name_prefix
+    )
+
+
+# executor threads do not survive a fork, so forked workers start their own
+os.register_at_fork(after_in_child=get_prefetch_executor.cache_clear)
+
+
+def iter_object_bytes(
+    client: boto3.client,
+    bucket: str,
+    keys: Iterable[str | tuple[str, int]],
+    max_workers: Optional[int] = None,
+    max_prefetch: Optional[int] = None,
+    max_prefetch_bytes: Optional[int] = None,
+) -> Generator[tuple[str, Optional[bytes]], None, None]:
+    """
+    Get objects from an S3 bucket, issuing GETs ahead of the consumer so that
+    request latency overlaps with whatever the caller does with each object.
+
+    Keys are pulled lazily from the iterable and at most max_prefetch requests
+    are in flight at once; results are yielded in the same order as the keys.
+    Keys given with their size are fetched with parallel ranged GETs when they
+    are larger than one transfer part, and also count towards max_prefetch_bytes,
+    which bounds the memory held by prefetched objects.
+
+    Args:
+        client (boto3.client): S3 client.
+        bucket (str): Bucket name.
+        keys (Iterable[str | tuple[str, int]]): Object keys, or keys and sizes.
+        max_workers (int): Number of threads issuing requests.
+        max_prefetch (int): Maximum number of requests in flight.
+        max_prefetch_bytes (int): Maximum total size of sized requests in flight.
+
+    Yields:
+        tuple[str, Optional[bytes]]: Object key and data, or None if the GET failed.
+    """
+    max_prefetch = max_prefetch or CONFIG.default_s3_prefetch_size
+    max_prefetch_bytes = max_prefetch_bytes or CONFIG.default_s3_prefetch_bytes
+    executor = get_prefetch_executor(max_workers or CONFIG.default_s3_prefetch_workers)
+    pending: deque[tuple[str, int, Future]] = deque()
+    pending_bytes = 0
+    try:
+        for key in keys:
+            size = 0
+            if isinstance(key, tuple):
+                key, size = key
+                future = executor.submit(
+                    get_object_bytes_ranged, client, bucket, key, size
+                )
+            else:
+                future = executor.submit(get_object_bytes, client, bucket, key)
+
+            pending.append((key, size, future))
+            pending_bytes += size
+
+            # yield the oldest objects until both the count and byte bounds hold
+            while len(pending) >= max_prefetch or pending_bytes > max_prefetch_bytes:
+                next_key, next_size, next_future = pending.popleft()
+                pending_bytes -= next_size
+                yield next_key, next_future.result()
+
+        # drain the remaining requests
+        while pending:
+            next_key, _, next_future = pending.popleft()
+            yield next_key, next_future.result()
+    finally:
+        # drop queued requests if the caller stopped iterating early
+        for _, _, pending_future in pending:
+            pending_future.cancel()
+
+
 def check_object_exists(
     client: boto3.client,
     bucket: str,
@@ -237,6 +571,90 @@ def check_prefix_exists(
         return False
 
 
+def iter_prefix_batches(
+    client: boto3.client,
+    bucket: str,
+    prefix: str,
+) -> Generator[list[dict[str, Any]], None, None]:
+    """
+    Iterate over pages of objects with a prefix in an S3 bucket.
+
+    Each page is the raw list of object summaries returned by list_objects_v2,
+    so callers can filter on fields like Size before issuing per-object requests.
+
+    Args:
+        client (boto3.client): S3 client.
+        bucket (str): Bucket name.
+        prefix (str): Prefix.
+
+    Yields:
+        list[dict[str, Any]]: Object summaries for one page of results.
+    """
+    # get the objects with the prefix
+    try:
+        list_paginator = client.get_paginator("list_objects_v2")
+        list_results = list_paginator.paginate(Bucket=bucket, Prefix=prefix)
+        for results in list_results:
+            if "Contents" in results:
+                yield results["Contents"]
+    except Exception as e:  # pylint: disable=broad-except
+        LOGGER.error("Error listing prefix: %s", e)
+
+
+def iter_prefix_batches_prefetched(
+    client: boto3.client,
+    bucket: str,
+    prefix: str,
+    max_pages: Optional[int] = None,
+) -> Generator[list[dict[str, Any]], None, None]:
+    """
+    Iterate over pages of objects with a prefix in an S3 bucket, listing the next
+    pages in a background thread so that LIST latency overlaps with whatever the
+    caller does with each page.
+
+    Args:
+        client (boto3.client): S3 client.
+        bucket (str): Bucket name.
+        prefix (str): Prefix.
+        max_pages (int): Maximum number of pages listed ahead of the caller.
+
+    Yields:
+        list[dict[str, Any]]: Object summaries for one page of results.
+    """
+    page_queue: queue.Queue = queue.Queue(
+        maxsize=max_pages or CONFIG.default_s3_list_prefetch_pages
+    )
+    stop_event = threading.Event()
+
+    def list_pages() -> None:
+        try:
+            for batch in iter_prefix_batches(client, bucket, prefix):
+                if stop_event.is_set():
+                    return
+                page_queue.put(batch)
+        finally:
+            # mark the end of the listing
+            page_queue.put(None)
+
+    list_thread = threading.Thread(target=list_pages, daemon=True)
+    list_thread.start()
+    try:
+        while True:
+            batch = page_queue.get()
+            if batch is None:
+                break
+            yield batch
+    finally:
+        # if the caller stopped early, drain the queue so that a listing thread
+        # blocked on a full queue can see the stop and exit
+        stop_event.set()
+        while list_thread.is_alive():
+            try:
+                page_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+
 def iter_prefix(
     client: boto3.client,
     bucket: str,
@@ -253,13 +671,67 @@ def iter_prefix(
     Yields:
         str: Object key.
     """
-    # get the objects with the prefix
+    for batch in iter_prefix_batches(client, bucket, prefix):
+        for obj in batch:
+            yield obj["Key"]
+
+
+def iter_prefix_parallel(
+    client: boto3.client,
+    bucket: str,
+    prefix: str,
+    max_workers: Optional[int] = None,
+) -> Generator[str, None, None]:
+    """
+    Iterate over objects with a prefix in an S3 bucket, listing each immediate
+    sub-prefix concurrently, since a single paginated listing is bound by the
+    latency of one page request after another.
+
+    Keys directly under the prefix are yielded first, then the keys of each
+    sub-prefix as its listing finishes, so keys are not in listing order.
+
+    Args:
+        client (boto3.client): S3 client.
+        bucket (str): Bucket name.
+        prefix (str): Prefix, normally ending with "/".
+        max_workers (int): Number of threads listing sub-prefixes.
+
+    Yields:
+        str: Object key.
+    """
+    max_workers = max_workers or CONFIG.default_s3_prefetch_workers
+    executor = get_prefetch_executor(max_workers, "s3-list")
+    pending: set[Future] = set()
     try:
         list_paginator = client.get_paginator("list_objects_v2")
-        list_results = list_paginator.paginate(Bucket=bucket, Prefix=prefix)
+        list_results = list_paginator.paginate(
+            Bucket=bucket, Prefix=prefix, Delimiter="/"
+        )
         for results in list_results:
-            if "Contents" in results:
-                for obj in results["Contents"]:
-                    yield obj["Key"]
+            for obj in results.get("Contents", []):
+                yield obj["Key"]
+
+            # list the sub-prefixes in the background with a bounded number in
+            # flight, yielding whichever finish first
+            for common_prefix in results.get("CommonPrefixes", []):
+                pending.add(
+                    executor.submit(
+                        list, iter_prefix(client, bucket, common_prefix["Prefix"])
+                    )
+                )
+                while len(pending) >= max_workers * 2:
+                    done_futures, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for done_future in done_futures:
+                        yield from done_future.result()
+
+        # wait for the remaining sub-prefixes
+        while pending:
+            done_futures, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for done_future in done_futures:
+                yield from done_future.result()
     except Exception as e:  # pylint: disable=broad-except
         LOGGER.error("Error listing prefix: %s", e)
+    finally:
+        # drop queued listings if the caller stopped iterating early
+        for pending_future in pending:
+            pending_future.cancel()
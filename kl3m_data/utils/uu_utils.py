@@ -32,16 +32,16 @@ def uuencode(
     if isinstance(input_buffer, bytes):
         input_buffer = io.BytesIO(input_buffer)
 
-    buffer = f"begin {mode:03o} {name}\n".encode()
+    # append into one growable buffer instead of reallocating bytes per line
+    buffer = bytearray(f"begin {mode:03o} {name}\n".encode())
     while True:
-        chunk = input_buffer.read(45)
+        chunk = input_buffer.read(UU_CHUNK_SIZE)
         if not chunk:
             break
-        encoded_chunk = binascii.b2a_uu(chunk)
-        buffer += encoded_chunk
+        buffer += binascii.b2a_uu(chunk)
     buffer += b"end\n"
 
-    return buffer
+    return bytes(buffer)
 
 
 def uudecode(input_buffer: Union[str, bytes, BinaryIO]) -> tuple[str, bytes]:
@@ -69,15 +69,15 @@ def uudecode(input_buffer: Union[str, bytes, BinaryIO]) -> tuple[str, bytes]:
     # parse the header but skip the mode
     _, name = header.split()[1:]
 
-    # read the data
-    data = b""
+    # read the data into one growable buffer; a2b_uu takes the raw line bytes
+    data = bytearray()
     while True:
-        line = input_buffer.readline().decode()
-        if line == "end\n":
+        line = input_buffer.readline()
+        if not line or line == b"end\n":
             break
         try:
             data += binascii.a2b_uu(line)
         except binascii.Error as e:
             raise ValueError("Invalid uuencoded input") from e
 
-    return name, data
+    return name, bytes(data)
@@ -0,0 +1,183 @@
+"""
+Shared test fixtures, including an in-memory S3 client
+"""
+
+# imports
+import hashlib
+import io
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Generator, Optional
+
+# packages
+import pytest
+
+# project
+from kl3m_data.utils import s3_utils
+
+
+class FakeS3Client:
+    """
+    In-memory stand-in for the subset of the boto3 S3 client used by the S3 utilities.
+    """
+
+    def __init__(self, page_size: int = 10, get_delay: float = 0.0):
+        """
+        Initialize the client.
+
+        Args:
+            page_size (int): Number of objects per listing page.
+            get_delay (float): Seconds to sleep in each GET.
+        """
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.page_size = page_size
+        self.get_delay = get_delay
+        self.fail_puts: set[str] = set()
+        self.gets: list[str] = []
+        self.lock = threading.Lock()
+
+    def summary(self, bucket: str, key: str) -> dict[str, Any]:
+        """
+        Get the listing summary for an object.
+
+        Args:
+            bucket (str): Bucket name.
+            key (str): Object key.
+
+        Returns:
+            dict[str, Any]: Object summary.
+        """
+        data = self.objects[(bucket, key)]
+        return {
+            "Key": key,
+            "Size": len(data),
+            "ETag": f'"{hashlib.md5(data).hexdigest()}"',
+        }
+
+    def list_keys(self, bucket: str, prefix: str) -> list[str]:
+        """
+        Get the sorted keys with a prefix.
+
+        Args:
+            bucket (str): Bucket name.
+            prefix (str): Prefix.
+
+        Returns:
+            list[str]: Object keys.
+        """
+        with self.lock:
+            return sorted(
+                key
+                for object_bucket, key in self.objects
+                if object_bucket == bucket and key.startswith(prefix)
+            )
+
+    def paginate(
+        self, Bucket: str, Prefix: str, Delimiter: Optional[str] = None
+    ) -> Generator[dict[str, Any], None, None]:
+        """
+        List objects in pages like the list_objects_v2 paginator.
+        """
+        keys = self.list_keys(Bucket, Prefix)
+        if Delimiter:
+            direct_keys = [key for key in keys if Delimiter not in key[len(Prefix) :]]
+            common_prefixes = sorted(
+                {
+                    Prefix + key[len(Prefix) :].split(Delimiter)[0] + Delimiter
+                    for key in keys
+                    if Delimiter in key[len(Prefix) :]
+                }
+            )
+            yield {
+                "Contents": [self.summary(Bucket, key) for key in direct_keys],
+                "CommonPrefixes": [{"Prefix": prefix} for prefix in common_prefixes],
+            }
+            return
+
+        for start in range(0, len(keys), self.page_size):
+            yield {
+                "Contents": [
+                    self.summary(Bucket, key)
+                    for key in keys[start : start + self.page_size]
+                ]
+            }
+
+    def get_paginator(self, operation_name: str) -> "FakeS3Client":
+        """
+        Get a paginator; only list_objects_v2 is supported.
+        """
+        assert operation_name == "list_objects_v2"
+        return self
+
+    def get_object(
+        self, Bucket: str, Key: str, Range: Optional[str] = None
+    ) -> dict[str, Any]:
+        """
+        Get an object body, optionally for an inclusive byte range.
+        """
+        if self.get_delay:
+            time.sleep(self.get_delay)
+        with self.lock:
+            self.gets.append(Key)
+            data = self.objects[(Bucket, Key)]
+        if Range:
+            start, end = map(int, Range.split("=")[1].split("-"))
+            data = data[start : end + 1]
+        return {"Body": io.BytesIO(data)}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs) -> dict:
+        """
+        Put an object, failing for keys in fail_puts.
+        """
+        if Key in self.fail_puts:
+            raise RuntimeError(f"Failed to put {Key}")
+        with self.lock:
+            self.objects[(Bucket, Key)] = bytes(Body)
+        return {}
+
+    def put_objects(self, bucket: str, keys: list[str]) -> None:
+        """
+        Store each key with its own name as the content.
+        """
+        for key in keys:
+            self.put_object(Bucket=bucket, Key=key, Body=key.encode())
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        """
+        Check that an object exists.
+        """
+        if (Bucket, Key) not in self.objects:
+            raise KeyError(Key)
+        return {}
+
+
+@pytest.fixture
+def fake_s3(monkeypatch: pytest.MonkeyPatch) -> FakeS3Client:
+    """
+    Route every S3 client in the package to a fresh in-memory client, without
+    put retry delays.
+    """
+    client = FakeS3Client()
+    monkeypatch.setattr(s3_utils, "get_cached_s3_client", lambda **kwargs: client)
+    monkeypatch.setattr(s3_utils, "PUT_OBJECT_BACKOFF", 0)
+    return client
+
+
+@pytest.fixture
+def make_future() -> Callable[..., Future]:
+    """
+    Get a factory for finished futures, holding either a result or an error.
+    """
+
+    def make_finished_future(
+        result: Any = None, error: Exception | None = None
+    ) -> Future:
+        future: Future = Future()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        return future
+
+    return make_finished_future
@@ -0,0 +1,94 @@
+"""
+Tests for the shared source upload collection and existing ids cache
+"""
+
+# imports
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+# project
+from kl3m_data.config import CONFIG
+from kl3m_data.sources.base_source import BaseSource, SourceProgressStatus
+from kl3m_data.sources.us.dockets.dockets_source import DocketsSource
+
+
+def test_collect_uploads_counts_results_and_reports_each_upload(make_future):
+    current_progress = SourceProgressStatus(total=None, description="test")
+    pending_uploads = deque(
+        [
+            ("stored", make_future(True)),
+            ("rejected", make_future(False)),
+            ("raised", make_future(error=RuntimeError("upload failed"))),
+        ]
+    )
+    uploads = []
+
+    BaseSource.collect_uploads(
+        pending_uploads,
+        current_progress,
+        on_upload=lambda document_id, uploaded: uploads.append((document_id, uploaded)),
+    )
+
+    assert not pending_uploads
+    assert sorted(uploads) == [("raised", False), ("rejected", False), ("stored", True)]
+    assert current_progress.success == 1
+    assert current_progress.failure == 2
+    assert current_progress.status is False
+
+
+def test_collect_uploads_leaves_max_pending_in_flight(make_future):
+    current_progress = SourceProgressStatus(total=None, description="test")
+    running_futures = [Future() for _ in range(3)]
+    pending_uploads = deque(
+        [("done", make_future(True))]
+        + [(f"running-{i}", future) for i, future in enumerate(running_futures)]
+    )
+
+    BaseSource.collect_uploads(pending_uploads, current_progress, max_pending=3)
+    assert [document_id for document_id, _ in pending_uploads] == [
+        "running-0",
+        "running-1",
+        "running-2",
+    ]
+    assert current_progress.success == 1
+
+    # draining waits for whichever upload finishes next
+    threading.Timer(0.05, lambda: [f.set_result(True) for f in running_futures]).start()
+    BaseSource.collect_uploads(pending_uploads, current_progress)
+    assert not pending_uploads
+    assert current_progress.success == 4
+
+
+def test_existing_ids_cache_includes_documents_stored_in_the_run(
+    fake_s3, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(CONFIG, "existing_ids_cache_path", str(tmp_path))
+    fake_s3.put_objects(CONFIG.default_s3_bucket, ["documents/dockets/a.json"])
+
+    with DocketsSource() as source:
+        assert source.load_existing_ids() == {"a"}
+        listing_time = source.existing_ids_time
+        source.mark_stored("b")
+        cache_file = source.get_existing_ids_cache_file()
+
+    # the rewritten cache keeps the listing time, so its TTL is not extended
+    assert os.stat(cache_file).st_mtime == listing_time
+
+    fake_s3.put_objects(CONFIG.default_s3_bucket, ["documents/dockets/c.json"])
+    with DocketsSource() as source:
+        assert source.load_existing_ids() == {"a", "b"}
+
+
+def test_existing_ids_cache_is_skipped_with_refresh_cache(
+    fake_s3, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(CONFIG, "existing_ids_cache_path", str(tmp_path))
+    fake_s3.put_objects(CONFIG.default_s3_bucket, ["documents/dockets/a.json"])
+    with DocketsSource() as source:
+        source.load_existing_ids()
+
+    fake_s3.put_objects(CONFIG.default_s3_bucket, ["documents/dockets/b.json"])
+    with DocketsSource(refresh_cache="true") as source:
+        assert source.load_existing_ids() == {"a", "b"}
@@ -0,0 +1,76 @@
+"""
+Tests for the dockets source, using the in-memory S3 client
+"""
+
+# packages
+import pytest
+
+# project
+from kl3m_data.config import CONFIG
+from kl3m_data.sources.base_source import SourceDownloadStatus
+from kl3m_data.sources.us.dockets.dockets_source import DocketsSource
+
+DOCKET_ID = "gov.uscourts.flnd.95674.docket.json"
+
+
+def make_record() -> dict:
+    """
+    Make a backtick-quoted docket CSV record.
+    """
+    return {
+        "id": "`6306820`",
+        "date_created": "`2018-02-16 09:06:28.261635+00`",
+        "case_name": "`SALVADOR v. MORGAN`",
+        "filepath_ia_json": f"`https://archive.org/download/gov.uscourts.flnd.95674/{DOCKET_ID}`",
+    }
+
+
+def test_download_record_reports_failed_uploads(fake_s3, monkeypatch):
+    source = DocketsSource()
+    source.existing_ids = set()
+    monkeypatch.setattr(source, "_get", lambda url: b'{"docket": true}')
+    document_key = f"documents/{source.metadata.dataset_id}/{DOCKET_ID}.json"
+
+    fake_s3.fail_puts.add(document_key)
+    assert source.download_record(make_record()) == SourceDownloadStatus.FAILURE
+    assert (CONFIG.default_s3_bucket, document_key) not in fake_s3.objects
+
+    fake_s3.fail_puts.clear()
+    assert source.download_record(make_record()) == SourceDownloadStatus.SUCCESS
+    assert (CONFIG.default_s3_bucket, document_key) in fake_s3.objects
+
+
+def test_download_record_skips_documents_stored_in_the_run(fake_s3, monkeypatch):
+    source = DocketsSource()
+    source.existing_ids = set()
+    monkeypatch.setattr(source, "_get", lambda url: b'{"docket": true}')
+
+    assert source.download_record(make_record()) == SourceDownloadStatus.SUCCESS
+    assert source.check_id(DOCKET_ID)
+    assert source.download_record(make_record()) == SourceDownloadStatus.EXISTED
+
+
+def test_get_docket_records_skips_short_rows(fake_s3, monkeypatch, tmp_path):
+    docket_path = tmp_path / "dockets.csv"
+    docket_path.write_text(
+        "id,case_name,filepath_ia_json\n"
+        "`1`,`A v. B`,`https://archive.org/download/1.docket.json`\n"
+        "`2`,`C v. D`\n"
+        "`3`,`E v. F`,`https://archive.org/download/3.docket.json`\n"
+    )
+    source = DocketsSource()
+    monkeypatch.setattr(source, "get_docket_file", lambda: docket_path)
+
+    assert [record["id"] for record in source.get_docket_records()] == ["`1`", "`3`"]
+
+
+def test_get_docket_records_rejects_a_header_without_urls(
+    fake_s3, monkeypatch, tmp_path
+):
+    docket_path = tmp_path / "dockets.csv"
+    docket_path.write_text("id,case_name\n`1`,`A v. B`\n")
+    source = DocketsSource()
+    monkeypatch.setattr(source, "get_docket_file", lambda: docket_path)
+
+    with pytest.raises(ValueError, match="filepath_ia_json"):
+        list(source.get_docket_records())
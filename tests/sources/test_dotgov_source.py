@@ -0,0 +1,26 @@
+"""
+Tests for the .gov file index records
+"""
+
+# project
+from kl3m_data.sources.us.dotgov.dotgov_source import (
+    FILE_RECORD_DECODER,
+    is_valid_file,
+)
+
+
+def test_file_record_decoder_accepts_loosely_typed_lines():
+    float_record = FILE_RECORD_DECODER.decode(
+        b'{"member_file": "a.gov/index.html", "mime_type": "text/html", "size": 12.0}'
+    )
+    assert is_valid_file(float_record) == (True, "text/html")
+
+    string_record = FILE_RECORD_DECODER.decode(
+        b'{"member_file": "a.gov/index.html", "mime_type": "text/html", "size": "12"}'
+    )
+    assert string_record.size == 12
+
+    mime_record = FILE_RECORD_DECODER.decode(
+        b'{"member_file": "a.gov/index.html", "mime_type": 5, "size": 12}'
+    )
+    assert is_valid_file(mime_record) == (False, None)
@@ -0,0 +1,21 @@
+"""
+Tests for the EDGAR source, using the in-memory S3 client
+"""
+
+# imports
+import datetime
+
+# project
+from kl3m_data.sources.us.edgar import edgar_source
+from kl3m_data.sources.us.edgar.edgar_source import EDGARSource, init_parse_worker
+
+
+def test_init_parse_worker_uses_the_parent_arguments(fake_s3, monkeypatch):
+    monkeypatch.setattr(edgar_source, "WORKER_SOURCE", None)
+    source = EDGARSource(update=True, min_date="2020-01-02", workers=1)
+
+    init_parse_worker(source.kwargs)
+
+    assert edgar_source.WORKER_SOURCE is not None
+    assert edgar_source.WORKER_SOURCE.update is True
+    assert edgar_source.WORKER_SOURCE.min_date == datetime.date(2020, 1, 2)
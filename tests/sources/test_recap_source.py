@@ -0,0 +1,145 @@
+"""
+Tests for the RECAP source, using the in-memory S3 client
+"""
+
+# imports
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# packages
+import pypdfium2
+
+# project
+from kl3m_data.config import CONFIG
+from kl3m_data.sources.base_source import SourceProgressStatus
+from kl3m_data.sources.us.recap import recap_source
+from kl3m_data.sources.us.recap.recap_source import (
+    RECAP_BUCKET,
+    RECAP_PREFIX,
+    RECAPSource,
+)
+
+
+def make_docket_key(i: int) -> str:
+    """
+    Make a RECAP docket object key.
+    """
+    return f"{RECAP_PREFIX}gov.uscourts.nysd.{i}.docket.xml"
+
+
+def get_stored_keys(client, dataset_id: str) -> set[str]:
+    """
+    Get the keys of the documents stored for a dataset.
+    """
+    return set(client.list_keys(CONFIG.default_s3_bucket, f"documents/{dataset_id}/"))
+
+
+def run_download(dedupe_path: Path) -> SourceProgressStatus:
+    """
+    Run a full download and return the final progress.
+    """
+    source = RECAPSource(dedupe_path=dedupe_path)
+    current_progress = None
+    for current_progress in source.download_all():
+        pass
+    return current_progress
+
+
+def test_iter_new_keys_counts_listing_skips(fake_s3):
+    for i in range(10):
+        fake_s3.put_object(
+            Bucket=RECAP_BUCKET,
+            Key=make_docket_key(i),
+            Body=b"" if i < 3 else b"<docket>%d</docket>" % i,
+        )
+
+    source = RECAPSource()
+    current_progress = SourceProgressStatus(total=None, description="test")
+    new_keys = list(source.iter_new_keys(RECAP_BUCKET, RECAP_PREFIX, current_progress))
+
+    assert len(new_keys) == 7
+    assert current_progress.current == 3
+    assert current_progress.success == 3
+    assert current_progress.failure == 0
+
+
+def test_download_all_resumes_after_failed_uploads(
+    fake_s3, tmp_path: Path, monkeypatch
+):
+    monkeypatch.setattr(RECAPSource, "dedupe_save_interval", 5)
+    for i in range(30):
+        fake_s3.put_object(
+            Bucket=RECAP_BUCKET,
+            Key=make_docket_key(i),
+            Body=b"<docket>%d</docket>" % (i % 25),
+        )
+    dataset_id = RECAPSource().metadata.dataset_id
+    failed_key = f"documents/{dataset_id}/gov.uscourts.nysd.7.docket.xml.json"
+    fake_s3.fail_puts.add(failed_key)
+
+    # the first run stores everything except the failed upload and the
+    # duplicates of stored content
+    first_progress = run_download(tmp_path)
+    first_keys = get_stored_keys(fake_s3, dataset_id)
+    assert failed_key not in first_keys
+    assert len(first_keys) == 24
+    assert first_progress.failure == 1
+    assert (tmp_path / recap_source.SEEN_ETAGS_FILE).exists()
+
+    # the failed upload was never recorded as seen, so a second run retries it
+    # and skips everything stored without fetching it again
+    fake_s3.fail_puts.clear()
+    fake_s3.gets.clear()
+    second_progress = run_download(tmp_path)
+    assert get_stored_keys(fake_s3, dataset_id) == first_keys | {failed_key}
+    assert second_progress.failure == 0
+    assert [key for key in fake_s3.gets if key.startswith(RECAP_PREFIX)] == [
+        make_docket_key(7)
+    ]
+
+
+def test_download_all_stops_at_max_documents(fake_s3):
+    for i in range(20):
+        fake_s3.put_object(
+            Bucket=RECAP_BUCKET,
+            Key=make_docket_key(i),
+            Body=b"<docket>%d</docket>" % i,
+        )
+
+    source = RECAPSource(max_documents=3)
+    for _ in source.download_all():
+        pass
+
+    assert len(get_stored_keys(fake_s3, source.metadata.dataset_id)) == 3
+
+
+def test_download_all_parses_pdf_metadata_in_worker_processes(fake_s3):
+    pdf_doc = pypdfium2.PdfDocument.new()
+    pdf_doc.new_page(200, 200)
+    pdf_doc.new_page(200, 200)
+    pdf_buffer = io.BytesIO()
+    pdf_doc.save(pdf_buffer)
+    pdf_doc.close()
+    fake_s3.put_object(
+        Bucket=RECAP_BUCKET,
+        Key=f"{RECAP_PREFIX}gov.uscourts.nysd.1.1.0.pdf",
+        Body=pdf_buffer.getvalue(),
+    )
+
+    with RECAPSource(parse_workers=1) as source:
+        for _ in source.download_all():
+            pass
+        dataset_id = source.metadata.dataset_id
+
+    document_key = f"documents/{dataset_id}/gov.uscourts.nysd.1.1.0.pdf.json"
+    document = json.loads(fake_s3.objects[(CONFIG.default_s3_bucket, document_key)])
+    assert document["extra"]["page_count"] == 2
+
+
+def test_get_process_pool_starts_one_pool_across_threads(fake_s3):
+    with RECAPSource(parse_workers=1) as source:
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            pools = list(executor.map(lambda _: source.get_process_pool(), range(64)))
+        assert all(pool is source.process_pool for pool in pools)
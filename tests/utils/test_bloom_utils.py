@@ -0,0 +1,95 @@
+"""
+Tests for the Bloom filter utilities
+"""
+
+# imports
+import hashlib
+from pathlib import Path
+
+# packages
+import pytest
+
+# project
+from kl3m_data.utils.bloom_utils import (
+    BloomFilter,
+    ScalableBloomFilter,
+    load_bloom_filter,
+)
+
+
+def make_keys(label: str, count: int) -> list[bytes]:
+    """
+    Make distinct 128-bit digest keys.
+    """
+    return [
+        hashlib.blake2b(f"{label}-{i}".encode(), digest_size=16).digest()
+        for i in range(count)
+    ]
+
+
+def test_bloom_filter_write_read_round_trip(tmp_path: Path):
+    bloom_filter = BloomFilter(1000, 0.01)
+    keys = make_keys("added", 500)
+    for key in keys:
+        bloom_filter.add(key)
+
+    filter_path = tmp_path / "filter.bin"
+    with open(filter_path, "wb") as output_file:
+        bloom_filter.write(output_file)
+    with open(filter_path, "rb") as input_file:
+        loaded_filter = BloomFilter.read(input_file)
+
+    assert loaded_filter.bits == bloom_filter.bits
+    assert len(loaded_filter) == len(bloom_filter)
+    assert all(key in loaded_filter for key in keys)
+
+
+def test_bloom_filter_read_rejects_truncated_file(tmp_path: Path):
+    bloom_filter = BloomFilter(1000, 0.01)
+    filter_path = tmp_path / "filter.bin"
+    with open(filter_path, "wb") as output_file:
+        bloom_filter.write(output_file)
+    filter_path.write_bytes(filter_path.read_bytes()[:-10])
+
+    with open(filter_path, "rb") as input_file, pytest.raises(ValueError):
+        BloomFilter.read(input_file)
+
+
+def test_scalable_bloom_filter_save_load_round_trip(tmp_path: Path):
+    scalable_filter = ScalableBloomFilter(initial_capacity=100, error_rate=0.01)
+    keys = make_keys("added", 1000)
+    for key in keys:
+        scalable_filter.add(key)
+    assert len(scalable_filter.filters) > 1
+
+    filter_path = tmp_path / "dedupe" / "seen.bloom"
+    scalable_filter.save(filter_path)
+    assert not filter_path.with_name(filter_path.name + ".tmp").exists()
+
+    loaded_filter = load_bloom_filter(filter_path)
+    assert len(loaded_filter) == len(scalable_filter)
+    assert len(loaded_filter.filters) == len(scalable_filter.filters)
+    assert all(key in loaded_filter for key in keys)
+
+
+def test_scalable_bloom_filter_false_positive_rate():
+    error_rate = 0.01
+    scalable_filter = ScalableBloomFilter(initial_capacity=1000, error_rate=error_rate)
+    for key in make_keys("added", 10000):
+        scalable_filter.add(key)
+
+    absent_keys = make_keys("absent", 20000)
+    false_positives = sum(1 for key in absent_keys if key in scalable_filter)
+    assert false_positives / len(absent_keys) < error_rate
+
+
+def test_load_bloom_filter_without_file(tmp_path: Path):
+    assert len(load_bloom_filter(None)) == 0
+    assert len(load_bloom_filter(tmp_path / "missing.bloom")) == 0
+
+
+def test_load_rejects_other_files(tmp_path: Path):
+    filter_path = tmp_path / "other.bloom"
+    filter_path.write_bytes(b"not a filter")
+    with pytest.raises(ValueError):
+        ScalableBloomFilter.load(filter_path)
@@ -0,0 +1,92 @@
+"""
+Tests for the compression utilities
+"""
+
+# imports
+import bz2
+import gzip
+from pathlib import Path
+
+# packages
+import pytest
+import zstandard
+
+# project
+from kl3m_data.utils.compression_utils import (
+    compress_zstd,
+    decompress_bytes,
+    detect_compression,
+    is_complete_zstd,
+    open_compressed,
+    recompress_zstd,
+)
+
+SAMPLE_DATA = b"".join(b"%d,http://example.com/%d\n" % (i, i) for i in range(50000))
+
+
+@pytest.mark.parametrize(
+    "compress",
+    [gzip.compress, bz2.compress, compress_zstd],
+)
+def test_decompress_bytes_round_trip(compress):
+    compressed_data = compress(SAMPLE_DATA)
+    assert detect_compression(compressed_data[:8]) is not None
+    assert decompress_bytes(compressed_data) == SAMPLE_DATA
+
+
+def test_decompress_bytes_passes_through_uncompressed():
+    assert detect_compression(SAMPLE_DATA[:8]) is None
+    assert decompress_bytes(SAMPLE_DATA) == SAMPLE_DATA
+
+
+@pytest.mark.parametrize("compress", [bz2.compress, gzip.compress, None])
+def test_recompress_zstd_round_trip(tmp_path: Path, compress):
+    input_path = tmp_path / "input"
+    input_path.write_bytes(compress(SAMPLE_DATA) if compress else SAMPLE_DATA)
+    output_path = tmp_path / "output.zst"
+
+    assert recompress_zstd(input_path, output_path) == output_path
+    assert not output_path.with_name(output_path.name + ".tmp").exists()
+    assert is_complete_zstd(output_path)
+    with open_compressed(output_path, "rb") as output_file:
+        assert output_file.read() == SAMPLE_DATA
+
+
+def test_recompress_zstd_keeps_existing_output_on_failure(tmp_path: Path):
+    input_path = tmp_path / "input.csv"
+    input_path.write_bytes(SAMPLE_DATA)
+    output_path = tmp_path / "output.zst"
+    recompress_zstd(input_path, output_path)
+    original_data = output_path.read_bytes()
+
+    # a corrupt input fails partway through without touching the output
+    bad_input = tmp_path / "bad.bz2"
+    bad_input.write_bytes(bz2.compress(SAMPLE_DATA)[:-100])
+    with pytest.raises(EOFError):
+        recompress_zstd(bad_input, output_path)
+    assert output_path.read_bytes() == original_data
+
+
+def test_is_complete_zstd_rejects_truncated_files(tmp_path: Path):
+    source_path = tmp_path / "input.csv"
+    source_path.write_bytes(SAMPLE_DATA * 4)
+    complete_path = recompress_zstd(source_path, tmp_path / "complete.zst")
+    complete_data = complete_path.read_bytes()
+
+    truncated_path = tmp_path / "truncated.zst"
+    for cut in range(0, len(complete_data), max(1, len(complete_data) // 200)):
+        truncated_path.write_bytes(complete_data[:cut])
+        assert not is_complete_zstd(truncated_path)
+
+    # trailing garbage is not a complete frame either
+    truncated_path.write_bytes(complete_data + b"\x00")
+    assert not is_complete_zstd(truncated_path)
+
+
+def test_is_complete_zstd_accepts_multiple_frames(tmp_path: Path):
+    frames_path = tmp_path / "frames.zst"
+    frames_path.write_bytes(
+        zstandard.ZstdCompressor().compress(b"a" * 10)
+        + zstandard.ZstdCompressor(write_checksum=True).compress(SAMPLE_DATA)
+    )
+    assert is_complete_zstd(frames_path)
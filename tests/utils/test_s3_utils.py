@@ -0,0 +1,149 @@
+"""
+Tests for the S3 utilities, using the in-memory S3 client
+"""
+
+# imports
+import os
+import threading
+import time
+
+# project
+from kl3m_data.utils.s3_utils import (
+    get_object_bytes_ranged,
+    iter_object_bytes,
+    iter_prefix,
+    iter_prefix_batches,
+    iter_prefix_batches_prefetched,
+    iter_prefix_parallel,
+    put_object_bytes,
+)
+
+BUCKET = "test-bucket"
+
+
+def wait_for_threads(thread_count: int, timeout: float = 5.0) -> int:
+    """
+    Wait for the active thread count to drop back to thread_count.
+    """
+    deadline = time.monotonic() + timeout
+    while threading.active_count() > thread_count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return threading.active_count()
+
+
+def test_iter_object_bytes_preserves_key_order(fake_s3):
+    keys = [f"docs/{i:03d}" for i in range(50)]
+    fake_s3.put_objects(BUCKET, keys)
+    fake_s3.get_delay = 0.001
+
+    results = list(
+        iter_object_bytes(
+            fake_s3, BUCKET, reversed(keys), max_workers=8, max_prefetch=16
+        )
+    )
+    assert [key for key, _ in results] == list(reversed(keys))
+    assert all(data == key.encode() for key, data in results)
+
+
+def test_iter_object_bytes_reports_missing_objects(fake_s3):
+    fake_s3.put_objects(BUCKET, ["docs/a"])
+    results = dict(iter_object_bytes(fake_s3, BUCKET, ["docs/a", "docs/missing"]))
+    assert results == {"docs/a": b"docs/a", "docs/missing": None}
+
+
+def test_iter_object_bytes_stops_prefetching_when_closed(fake_s3):
+    keys = [f"docs/{i:03d}" for i in range(100)]
+    fake_s3.put_objects(BUCKET, keys)
+    fake_s3.get_delay = 0.01
+
+    object_iterator = iter_object_bytes(
+        fake_s3, BUCKET, iter(keys), max_workers=2, max_prefetch=4
+    )
+    assert next(object_iterator)[0] == keys[0]
+    object_iterator.close()
+
+    # queued requests are cancelled, so only those already running finish
+    time.sleep(0.1)
+    assert len(fake_s3.gets) <= 6
+
+
+def test_iter_object_bytes_ranged_keys(fake_s3):
+    data = os.urandom(2_500_001)
+    fake_s3.put_object(Bucket=BUCKET, Key="docs/large", Body=data)
+    fake_s3.put_objects(BUCKET, ["docs/small"])
+
+    results = dict(
+        iter_object_bytes(
+            fake_s3, BUCKET, [("docs/large", len(data)), ("docs/small", 10)]
+        )
+    )
+    assert results["docs/large"] == data
+    assert results["docs/small"] == b"docs/small"
+
+
+def test_get_object_bytes_ranged(fake_s3):
+    data = os.urandom(1_000_003)
+    fake_s3.put_object(Bucket=BUCKET, Key="docs/large", Body=data)
+
+    assert (
+        get_object_bytes_ranged(
+            fake_s3, BUCKET, "docs/large", len(data), part_size=100_000
+        )
+        == data
+    )
+    assert len([key for key in fake_s3.gets if key == "docs/large"]) == 11
+
+    # a size larger than the object is a short read rather than padded data
+    assert (
+        get_object_bytes_ranged(
+            fake_s3, BUCKET, "docs/large", len(data) + 10, part_size=100_000
+        )
+        is None
+    )
+
+
+def test_iter_prefix_batches_prefetched_matches_listing(fake_s3):
+    keys = [f"docs/{i:03d}" for i in range(95)]
+    fake_s3.put_objects(BUCKET, keys + ["other/key"])
+
+    prefetched_batches = list(
+        iter_prefix_batches_prefetched(fake_s3, BUCKET, "docs/", max_pages=2)
+    )
+    assert prefetched_batches == list(iter_prefix_batches(fake_s3, BUCKET, "docs/"))
+    assert [obj["Key"] for batch in prefetched_batches for obj in batch] == keys
+
+
+def test_iter_prefix_batches_prefetched_stops_when_closed(fake_s3):
+    fake_s3.put_objects(BUCKET, [f"docs/{i:03d}" for i in range(500)])
+    thread_count = threading.active_count()
+
+    batch_iterator = iter_prefix_batches_prefetched(
+        fake_s3, BUCKET, "docs/", max_pages=1
+    )
+    assert len(next(batch_iterator)) == fake_s3.page_size
+    batch_iterator.close()
+
+    # the listing thread, blocked on the full queue, exits
+    assert wait_for_threads(thread_count) == thread_count
+
+
+def test_iter_prefix_parallel_lists_every_key_once(fake_s3):
+    keys = [f"docs/{i:03d}.json" for i in range(5)] + [
+        f"docs/{court}/{i:03d}.json"
+        for court in ("ca1", "nysd", "txed")
+        for i in range(25)
+    ]
+    fake_s3.put_objects(BUCKET, keys + ["other/key"])
+
+    parallel_keys = list(iter_prefix_parallel(fake_s3, BUCKET, "docs/", max_workers=2))
+    assert len(parallel_keys) == len(keys)
+    assert sorted(parallel_keys) == sorted(iter_prefix(fake_s3, BUCKET, "docs/"))
+
+
+def test_put_object_bytes_retries_then_fails(fake_s3):
+    assert put_object_bytes(fake_s3, BUCKET, "docs/a", "content")
+    assert fake_s3.objects[(BUCKET, "docs/a")] == b"content"
+
+    fake_s3.fail_puts.add("docs/b")
+    assert not put_object_bytes(fake_s3, BUCKET, "docs/b", b"content")
+    assert (BUCKET, "docs/b") not in fake_s3.objects